@@ -1,30 +1,28 @@
 import sys
+import asyncio
 from datetime import datetime
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from sentence_transformers import SentenceTransformer
-from langchain_chroma import Chroma
 from langchain.schema import Document
 
 from src.llm_factory.gemini import GoogleGen
 from src.helpers.relevance_checker import *
 from src.helpers.document_retriever import *
+from src.helpers.exact_match import lookup_exact_question
 from src.config.logs import get_logger
+from src.config.settings import EXACT_MATCH_MODE
 
 # Import database configuration and models
 from src.config.database import get_db, Base, engine
-from src.models.user_memory import UserMemory, init_db
+from src.models.user_memory import UserMemory
 from src.helpers.user_memory_manager import UserMemoryManager
 
-# Initialize the database
-init_db()
-
 import time
 import os
 from pathlib import Path
 import json
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -102,13 +100,87 @@ class Nodes:
         # except Exception as e:
         #     logger.error(f"Search failed for state['user_input'] '{state['user_input']}': {str(e)}")
         #     return []
+
+    async def ainitiate_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of initiate_state; the SQLite read runs in a worker thread"""
+        return await asyncio.to_thread(self.initiate_state, state)
+    
+    def _exact_match_entry(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Look the question up in the exact-question index"""
+        state['response_source'] = ''
+        if EXACT_MATCH_MODE == 'off':
+            return None
+        try:
+            entry = lookup_exact_question(state['user_input'])
+        except Exception as e:
+            logger.error(f"Exact-question lookup failed: {str(e)}")
+            return None
+        if entry:
+            logger.info(f"Exact knowledge base match for: {state['user_input']}")
+            state['search_results'] = [{
+                "question": entry['question'],
+                "answer": entry['answer'],
+                "score": 1.0,
+                "is_relevant": True
+            }]
+        return entry
+
+    def _personalize_messages(self, state: Dict[str, Any], entry: Dict[str, Any]) -> Optional[list]:
+        """Prompt adapting a curated answer to the patient, or None when there is no patient context"""
+        if EXACT_MATCH_MODE != 'personalize':
+            return None
+        if not state.get('patient_name') and not state.get('patient_description'):
+            return None
+        with open(os.path.abspath(os.path.join(current_dir, "..", "prompts/personalize.txt")), "r") as file:
+            template = file.read()
+        prompt = template.format(
+            question=entry['question'],
+            answer=entry['answer'],
+            patient_name=state.get('patient_name', ''),
+            patient_description=state.get('patient_description', '')
+        )
+        return [HumanMessage(content=prompt)]
+
+    def _answer_exact_match(self, state: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        state['messages'].append(AIMessage(content=answer))
+        state['response_source'] = 'exact_match'
+        return state
+
+    def exact_match(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer questions found verbatim in the knowledge base without retrieval"""
+        entry = self._exact_match_entry(state)
+        if not entry:
+            return state
+        answer = entry['answer']
+        try:
+            messages = self._personalize_messages(state, entry)
+            if messages:
+                answer = self.llm_obj(messages, prompt_type='personalize').content
+        except Exception as e:
+            logger.error(f"Error personalizing exact match, using the curated answer: {str(e)}")
+        return self._answer_exact_match(state, answer)
+
+    async def aexact_match(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of exact_match using a non-blocking LLM call for personalization"""
+        entry = self._exact_match_entry(state)
+        if not entry:
+            return state
+        answer = entry['answer']
+        try:
+            messages = self._personalize_messages(state, entry)
+            if messages:
+                answer = (await self.llm_obj.ainvoke(messages, prompt_type='personalize')).content
+        except Exception as e:
+            logger.error(f"Error personalizing exact match, using the curated answer: {str(e)}")
+        return self._answer_exact_match(state, answer)
     
     def document_retriever(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Document retriever"""
         logger.info(f"Running document retriever")
         try:
             query = state["user_input"]
-            search_results = search_qa(query)
+            # A failed search must not look like a query with no matches
+            search_results = search_qa(query, raise_errors=True)
             
             if not search_results:
                 logger.warning("No search results found for query")
@@ -131,6 +203,38 @@ class Nodes:
             
             logger.info(f"Error in document retriever: {str(e)}")
             return state
+
+    async def adocument_retriever(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of document_retriever; embedding and vector search run in a worker thread"""
+        return await asyncio.to_thread(self.document_retriever, state)
+
+    def _filter_relevant(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the search results flagged as relevant"""
+        state["search_results"] = [
+            result for result in state["search_results"] 
+            if result.get("is_relevant", False)
+        ]
+        
+        if not state["search_results"]:
+            logger.info("No relevant results found after relevance check")
+            state["messages"].append(
+                AIMessage(content="I couldn't find any relevant information for your query. Could you please provide more details or rephrase your question?")
+            )
+            
+        logger.info(f"Search results: {state['search_results']}")
+        return state
+            
+    def _record_relevance_stats(self, state: Dict[str, Any], stats: Dict[str, Any]) -> None:
+        """Keep the per-request relevance gate counts in the state"""
+        state["relevance_stats"] = stats
+        logger.info(
+            f"Relevance gate ({stats.get('strategy', 'llm')}): {stats['accepted_locally']} accepted and {stats['rejected_locally']} rejected locally, "
+            f"{stats['sent_to_llm']} sent to the LLM in {stats['llm_calls']} call(s), {stats['llm_calls_avoided']} call(s) avoided"
+        )
+        # Failed checks count as not relevant, so the answer may miss sources
+        if stats.get('llm_errors'):
+            logger.warning(f"{stats['llm_errors']} relevance check(s) failed")
+            state["error_state"] = True
             
     def relevance_checker(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Check relevance of search results"""
@@ -141,24 +245,14 @@ class Nodes:
                 logger.warning("No search results to check for relevance")
                 return state
                 
-            # Check relevance for each result
-            for result in state["search_results"]:
-                result["is_relevant"] = check_relevance(state["user_input"], result)
+            # Decide locally where the relevance strategy allows, ask the LLM about the rest
+            verdicts, stats = check_relevance_with_strategy(state["user_input"], state["search_results"], self.llm_obj)
+            for result, is_relevant in zip(state["search_results"], verdicts):
+                result["is_relevant"] = is_relevant
+            self._record_relevance_stats(state, stats)
             
             # Filter out irrelevant results
-            state["search_results"] = [
-                result for result in state["search_results"] 
-                if result.get("is_relevant", False)
-            ]
-            
-            if not state["search_results"]:
-                logger.info("No relevant results found after relevance check")
-                state["messages"].append(
-                    AIMessage(content="I couldn't find any relevant information for your query. Could you please provide more details or rephrase your question?")
-                )
-                
-            logger.info(f"Search results: {state['search_results']}")
-            return state
+            return self._filter_relevant(state)
             
         except Exception as e:
             logger.error(f"Error in relevance checker: {str(e)}")
@@ -169,6 +263,32 @@ class Nodes:
             
             logger.info(f"Error in relevance checker: {str(e)}")
             return state
+
+    async def arelevance_checker(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of relevance_checker using non-blocking LLM calls"""
+        logger.info(f"Running relevance checker")
+        try:
+            # Skip if no search results
+            if not state.get("search_results"):
+                logger.warning("No search results to check for relevance")
+                return state
+                
+            # Decide locally where the relevance strategy allows, ask the LLM about the rest
+            verdicts, stats = await acheck_relevance_with_strategy(state["user_input"], state["search_results"], self.llm_obj)
+            for result, is_relevant in zip(state["search_results"], verdicts):
+                result["is_relevant"] = is_relevant
+            self._record_relevance_stats(state, stats)
+            
+            # Filter out irrelevant results
+            return self._filter_relevant(state)
+            
+        except Exception as e:
+            logger.error(f"Error in relevance checker: {str(e)}")
+            state["error_state"] = True
+            state["messages"].append(
+                AIMessage(content="I apologize, but I encountered an error while processing your request. Please try again.")
+            )
+            return state
             
     def prepare_prompt(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -235,7 +355,21 @@ class Nodes:
         try:
             ai_response=[self.llm_obj.llm.invoke(state['messages'])]
             logger.info(f"AI Response: {ai_response}")
-            return {"messages":ai_response}
+            return {"messages":ai_response, "response_source": "cancer_agent"}
+            
+        except Exception as e:
+            logger.error(f"Error in agent node: {str(e)}")
+            state['error_state'] = True
+            state['messages'].append(AIMessage(content="I apologize, but I encountered an error while processing your request. Please try again."))
+            return state
+
+    async def aagent(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of agent using a non-blocking Gemini call."""
+        logger.info(f"Running the agent state")
+        try:
+            ai_response=[await self.llm_obj.llm.ainvoke(state['messages'])]
+            logger.info(f"AI Response: {ai_response}")
+            return {"messages":ai_response, "response_source": "cancer_agent"}
             
         except Exception as e:
             logger.error(f"Error in agent node: {str(e)}")
@@ -258,6 +392,8 @@ class Nodes:
             # Get the last AI message
             if 'messages' in state and state['messages']:
                 last_message = state['messages'][-1]
+                # Keep the bare answer for streaming clients, which get sources separately
+                state['answer'] = last_message.content
                 
                 # Format sources
                 sources = []
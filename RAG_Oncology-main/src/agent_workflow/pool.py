@@ -0,0 +1,113 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config.logs import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+class WorkFlowPool:
+    """
+    A fixed-size pool of pre-built WorkFlow instances.
+
+    Building a WorkFlow creates the Gemini client, binds the tools and compiles
+    the LangGraph graph, so the pool builds its instances once at startup and
+    hands each one to a single request at a time.
+    """
+
+    def __init__(self, size: int = 2, factory: Optional[Callable[[], Any]] = None):
+        if size < 1:
+            raise ValueError("Workflow pool size must be at least 1")
+        self.size = size
+        self.factory = factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._uses: Dict[int, int] = {}
+        self._created = 0
+        self._acquisitions = 0
+        self._reused = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _build(self) -> List[Any]:
+        """Build all pool instances (blocking)."""
+        if self.factory is None:
+            # Imported here so creating the pool does not pull in LangGraph and the LLM clients
+            from src.agent_workflow.workflow import WorkFlow
+            self.factory = WorkFlow
+        workflows = []
+        for _ in range(self.size):
+            start = time.perf_counter()
+            workflows.append(self.factory())
+            self._created += 1
+            logger.info(f"Workflow instance {self._created}/{self.size} built in {time.perf_counter() - start:.2f}s")
+        return workflows
+
+    async def start(self) -> None:
+        """Build the pool instances off the event loop and make them available."""
+        if self._queue is not None:
+            return
+        workflows = await asyncio.to_thread(self._build)
+        self._queue = asyncio.Queue()
+        for workflow in workflows:
+            self._uses[id(workflow)] = 0
+            self._queue.put_nowait(workflow)
+        logger.info(f"Workflow pool ready with {self.size} instance(s)")
+
+    @property
+    def started(self) -> bool:
+        return self._queue is not None
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Borrow a workflow for the duration of a request.
+
+        Args:
+            timeout: Maximum seconds to wait for a free instance (None waits forever)
+
+        Raises:
+            RuntimeError: If the pool has not been started
+            asyncio.TimeoutError: If no instance became free in time
+        """
+        if self._queue is None:
+            raise RuntimeError("Workflow pool has not been started")
+
+        start = time.perf_counter()
+        try:
+            workflow = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+
+        self._acquisitions += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        if self._uses.get(id(workflow), 0) > 0:
+            self._reused += 1
+        self._uses[id(workflow)] = self._uses.get(id(workflow), 0) + 1
+
+        try:
+            yield workflow
+        finally:
+            self._queue.put_nowait(workflow)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reuse, creation and wait-time statistics for the pool."""
+        available = self._queue.qsize() if self._queue is not None else 0
+        return {
+            "size": self.size,
+            "started": self.started,
+            "available": available,
+            "in_use": self.size - available if self.started else 0,
+            "created": self._created,
+            "acquisitions": self._acquisitions,
+            "reused": self._reused,
+            "timeouts": self._timeouts,
+            "total_wait_seconds": round(self._total_wait, 6),
+            "avg_wait_seconds": round(self._total_wait / self._acquisitions, 6) if self._acquisitions else 0.0,
+            "max_wait_seconds": round(self._max_wait, 6),
+        }
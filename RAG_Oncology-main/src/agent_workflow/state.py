@@ -9,4 +9,7 @@ class State(TypedDict):
     patient_id: int
     patient_name: str
     patient_description: str
-    error_state: bool
\ No newline at end of file
+    error_state: bool
+    answer: str
+    response_source: str
+    relevance_stats: dict
\ No newline at end of file
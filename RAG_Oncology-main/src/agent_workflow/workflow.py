@@ -1,9 +1,10 @@
 from langgraph.graph import StateGraph
 from src.agent_workflow.nodes import Nodes
 from src.agent_workflow.state import State
-from typing import Dict, Any, Callable, Generator, Optional, List
+from typing import Dict, Any, AsyncIterator, Callable, Generator, Optional, List, Tuple
 from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 from src.config.logs import get_logger
 from datetime import datetime
 import uuid
@@ -25,9 +26,9 @@ class WorkFlow:
             self._setup_edges()
             
             # Compile with checkpointing
-            memory = MemorySaver()
-            self.workflow = self.workflow.compile(checkpointer=memory)
-            self.config={'configurable':{'thread_id':'1'}}
+            self.memory = MemorySaver()
+            self.workflow = self.workflow.compile(checkpointer=self.memory)
+            self.config={'configurable':{'thread_id':str(uuid.uuid4())}}
                 
         except Exception as e:
             logger.error(f"Failed to initialize workflow: {str(e)}")
@@ -36,11 +37,14 @@ class WorkFlow:
     def _setup_nodes(self):
         """Setup all workflow nodes"""
         try:
-            self.workflow.add_node('initiate_state', self.nodes.initiate_state)
-            self.workflow.add_node('document_retriever', self.nodes.document_retriever)
-            self.workflow.add_node('relevance_checker', self.nodes.relevance_checker)
+            # Nodes with blocking I/O get an async variant used by ainvoke;
+            # the rest are cheap and run in the default executor
+            self.workflow.add_node('initiate_state', RunnableLambda(self.nodes.initiate_state, afunc=self.nodes.ainitiate_state))
+            self.workflow.add_node('exact_match', RunnableLambda(self.nodes.exact_match, afunc=self.nodes.aexact_match))
+            self.workflow.add_node('document_retriever', RunnableLambda(self.nodes.document_retriever, afunc=self.nodes.adocument_retriever))
+            self.workflow.add_node('relevance_checker', RunnableLambda(self.nodes.relevance_checker, afunc=self.nodes.arelevance_checker))
             self.workflow.add_node('prepare_prompt', self.nodes.prepare_prompt)
-            self.workflow.add_node('agent', self.nodes.agent)
+            self.workflow.add_node('agent', RunnableLambda(self.nodes.agent, afunc=self.nodes.aagent))
             self.workflow.add_node('final_state', self.nodes.final_state)
             logger.info("Nodes setup completed")
         except Exception as e:
@@ -52,7 +56,9 @@ class WorkFlow:
         try:
             # Basic flow
             self.workflow.add_edge("__start__", 'initiate_state')
-            self.workflow.add_edge('initiate_state', 'document_retriever')
+            self.workflow.add_edge('initiate_state', 'exact_match')
+            # Questions found verbatim in the knowledge base skip retrieval and generation
+            self.workflow.add_conditional_edges('exact_match', self.exact_match_condition, {True:'final_state',False:'document_retriever'})
             self.workflow.add_edge('document_retriever', 'relevance_checker')
             self.workflow.add_conditional_edges('relevance_checker', self.condition_function, {True:'prepare_prompt',False:"final_state"})
             self.workflow.add_edge('prepare_prompt', 'agent')
@@ -63,6 +69,25 @@ class WorkFlow:
             logger.error(f"Error setting up edges: {str(e)}")
             raise
 
+    def _new_thread_config(self) -> Dict[str, Any]:
+        """Start a fresh checkpoint thread for the next run.
+
+        The instance is reused across requests, so each run gets its own
+        thread and the previous one is dropped from the checkpointer; the
+        latest thread is kept so show_state still works after a call.
+        """
+        previous_thread = self.config['configurable']['thread_id']
+        try:
+            if hasattr(self.memory, 'delete_thread'):
+                self.memory.delete_thread(previous_thread)
+            else:
+                self.memory.storage.pop(previous_thread, None)
+        except Exception as e:
+            logger.warning(f"Could not release checkpoint thread {previous_thread}: {str(e)}")
+
+        self.config = {'configurable': {'thread_id': str(uuid.uuid4())}}
+        return self.config
+
     def __call__(self, message: str, patient_id: int = 0):
         """Execute the workflow with the given message and optional patient ID
         
@@ -78,9 +103,87 @@ class WorkFlow:
                 'user_input': message,
                 'patient_id': patient_id if patient_id else 0
             },
-            self.config
+            self._new_thread_config()
         )
         return response
+
+    async def ainvoke(self, message: str, patient_id: int = 0):
+        """Execute the workflow asynchronously without blocking the event loop
+        
+        Args:
+            message: The user's message
+            patient_id: Optional patient ID to retrieve patient context
+            
+        Returns:
+            The workflow response
+        """
+        response = await self.workflow.ainvoke(
+            {
+                'user_input': message,
+                'patient_id': patient_id if patient_id else 0
+            },
+            self._new_thread_config()
+        )
+        return response
+
+    async def astream(self, message: str, patient_id: int = 0) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the workflow, yielding agent tokens as soon as they are generated
+        
+        Args:
+            message: The user's message
+            patient_id: Optional patient ID to retrieve patient context
+            
+        Yields:
+            ('token', text) for each piece of the answer, then ('final', state)
+            with the final workflow state
+        """
+        final_state: Dict[str, Any] = {}
+        streamed = False
+        async for mode, chunk in self.workflow.astream(
+            {
+                'user_input': message,
+                'patient_id': patient_id if patient_id else 0
+            },
+            self._new_thread_config(),
+            stream_mode=["messages", "values"]
+        ):
+            if mode == "values":
+                final_state = chunk
+                continue
+            
+            # Only forward what the agent node generates, not the relevance checks
+            message_chunk, metadata = chunk
+            if metadata.get("langgraph_node") != "agent":
+                continue
+            if not isinstance(message_chunk, (AIMessageChunk, AIMessage)):
+                continue
+            text = self._content_text(message_chunk.content)
+            if text:
+                streamed = True
+                yield "token", text
+        
+        # Paths that skip the agent (no relevant sources, errors) produce a canned reply
+        if not streamed:
+            answer = final_state.get('answer')
+            if not answer and final_state.get('messages'):
+                answer = self._content_text(final_state['messages'][-1].content)
+            if answer:
+                yield "token", answer
+        
+        yield "final", final_state
+
+    @staticmethod
+    def _content_text(content: Any) -> str:
+        """Extract plain text from a message content (string or list of parts)"""
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                part if isinstance(part, str) else part.get("text", "")
+                for part in content
+                if isinstance(part, (str, dict))
+            )
+        return ""
     
     def show_state(self) -> None:
         """Display the current conversation state"""
@@ -119,6 +222,10 @@ class WorkFlow:
             logger.error(f"Error returning state value: {str(e)}")
             return None
         
+    def exact_match_condition(self, state: Dict[str, Any]) -> bool:
+        """Condition function to check if the question was answered from the exact-question index"""
+        return state.get('response_source') == 'exact_match'
+
     def condition_function(self, state: Dict[str, Any]) -> bool:
         """Condition function to check if the search results are relevant"""
         
@@ -1,6 +1,7 @@
 from typing import Dict, Any
-from src.llm_factory.gemini import GoogleGen
-from src.relevance_check.relevance_check import HybridRelevanceChecker
+from src.llm_factory.gemini import GoogleGen, count_llm_calls
+from src.config.settings import ANSWER_ONE_SHOT
+from src.relevance_check.relevance_check_edit import HybridRelevanceChecker
 from langchain_core.messages import HumanMessage, SystemMessage
 import logging
 
@@ -21,17 +22,45 @@ class AnswerGenerator:
         "I only answer cancer-related questions."""
 
     def generate(self, query: str) -> Dict[str, Any]:
-        # Initial oncology check
-        if not self.relevance_checker.is_oncology_related(query):
+        """Answer a question, reporting how many LLM calls it took"""
+        with count_llm_calls() as llm_calls:
+            result = self._generate(query)
+        result['llm_calls'] = llm_calls.total
+        result['llm_calls_by_type'] = dict(llm_calls.by_type)
+        logger.info(f"Answered with {llm_calls.total} LLM call(s): {llm_calls.by_type}")
+        return result
+
+    def _generate(self, query: str) -> Dict[str, Any]:
+        on_topic = None
+        candidates = None
+        # One structured call for the topic and every candidate, when enabled
+        if ANSWER_ONE_SHOT:
+            on_topic, _ = self.relevance_checker.local_topic(query)
+            if on_topic is not False:
+                candidates = self.relevance_checker.retrieve_candidates(query)
+            match_result = self.relevance_checker.check_match_one_shot(query, on_topic=on_topic, candidates=candidates)
+            if match_result is not None:
+                return self._from_match_result(match_result)
+            logger.info("One-shot verification unusable, falling back to separate calls")
+        
+        # Initial oncology check, computed once and shared with check_match
+        if on_topic is None:
+            on_topic = self.relevance_checker.is_oncology_related(query)
+        if not on_topic:
+            return self._from_match_result({'status': 'off_topic', 'match_data': None})
+        
+        # Check for direct matches, reusing the search of the one-shot attempt
+        match_result = self.relevance_checker.check_match(query, on_topic=on_topic, candidates=candidates)
+        return self._from_match_result(match_result)
+
+    def _from_match_result(self, match_result: Dict[str, Any]) -> Dict[str, Any]:
+        if match_result['status'] == 'off_topic':
             return {
                 'answer': "I only answer cancer-related questions.",
                 'source': 'filtered',
                 'confidence': 1.0
             }
         
-        # Check for direct matches
-        match_result = self.relevance_checker.check_match(query)
-        
         # Return direct match if exists
         if match_result['status'] == 'direct_match':
             return {
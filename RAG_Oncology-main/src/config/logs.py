@@ -55,7 +55,4 @@ def get_logger(name):
     Returns:
         logging.Logger: Configured logger instance
     """
-    return logging.getLogger(name)
-
-# Initialize logging when this module is imported
-setup_logging()
\ No newline at end of file
+    return logging.getLogger(name)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables from .env file in the project root
+env_path = Path(__file__).resolve().parents[2] / '.env'
+load_dotenv(env_path)
+
+def _env_int(name, default):
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _env_float(name, default):
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def _env_bool(name, default):
+    """Read a boolean setting from the environment."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _env_choice(name, default, choices):
+    """Read a setting that must be one of `choices`; unknown values fail at startup."""
+    value = (os.getenv(name) or default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+# Workflow pool used by the /chat endpoint
+WORKFLOW_POOL_SIZE = _env_int('WORKFLOW_POOL_SIZE', 2)
+WORKFLOW_POOL_TIMEOUT = _env_float('WORKFLOW_POOL_TIMEOUT', 30.0)
+
+# Relevance checking
+RELEVANCE_BATCH_MODE = _env_bool('RELEVANCE_BATCH_MODE', True)
+
+# Score gate in front of the relevance LLM: results scoring at least the accept
+# threshold are kept and results below the reject threshold dropped without an LLM
+# call. Bi-encoder thresholds are cosine similarities, cross-encoder ones raw logits.
+RELEVANCE_SCORE_GATING = _env_bool('RELEVANCE_SCORE_GATING', True)
+RELEVANCE_ACCEPT_SCORE = _env_float('RELEVANCE_ACCEPT_SCORE', 0.80)
+RELEVANCE_REJECT_SCORE = _env_float('RELEVANCE_REJECT_SCORE', 0.30)
+RELEVANCE_CE_ACCEPT_SCORE = _env_float('RELEVANCE_CE_ACCEPT_SCORE', 5.0)
+RELEVANCE_CE_REJECT_SCORE = _env_float('RELEVANCE_CE_REJECT_SCORE', -5.0)
+
+# Who decides relevance: 'llm' (score gate, then the LLM), 'cross_encoder' (one local
+# batched cross-encoder pass, no network call) or 'hybrid' (the cross-encoder decides
+# the confident results, the LLM the uncertain band). Thresholds are probabilities of
+# the cross-encoder logits after the Platt calibration fitted at ingestion
+# (src/helpers/relevance_calibration.py). Without a calibration file the plain sigmoid
+# is used: ms-marco logits are trained with a binary cross-entropy loss, so 0.5 is
+# their even-odds point, but that is not calibrated on this knowledge base.
+RELEVANCE_STRATEGY = _env_choice('RELEVANCE_STRATEGY', 'llm', ('llm', 'cross_encoder', 'hybrid'))
+RELEVANCE_CE_THRESHOLD = _env_float('RELEVANCE_CE_THRESHOLD', 0.5)
+RELEVANCE_HYBRID_ACCEPT_PROB = _env_float('RELEVANCE_HYBRID_ACCEPT_PROB', 0.9)
+RELEVANCE_HYBRID_REJECT_PROB = _env_float('RELEVANCE_HYBRID_REJECT_PROB', 0.1)
+RELEVANCE_CE_BATCH_SIZE = _env_int('RELEVANCE_CE_BATCH_SIZE', 32)
+
+# Fan-out of independent per-candidate LLM calls
+LLM_CONCURRENCY_LIMIT = _env_int('LLM_CONCURRENCY_LIMIT', 5)
+LLM_CALL_TIMEOUT = _env_float('LLM_CALL_TIMEOUT', 20.0)
+
+# Semantic answer cache in front of the workflow
+SEMANTIC_CACHE_ENABLED = _env_bool('SEMANTIC_CACHE_ENABLED', True)
+SEMANTIC_CACHE_THRESHOLD = _env_float('SEMANTIC_CACHE_THRESHOLD', 0.95)
+SEMANTIC_CACHE_MAX_ENTRIES = _env_int('SEMANTIC_CACHE_MAX_ENTRIES', 1000)
+SEMANTIC_CACHE_TTL = _env_float('SEMANTIC_CACHE_TTL', 24 * 3600)
+SEMANTIC_CACHE_MAX_MB = _env_float('SEMANTIC_CACHE_MAX_MB', 64)
+
+# Opt-in cache of LLM completions (in-process LRU + SQLite)
+LLM_CACHE_ENABLED = _env_bool('LLM_CACHE_ENABLED', False)
+LLM_CACHE_PATH = Path(os.getenv('LLM_CACHE_PATH') or Path(__file__).resolve().parents[2] / 'data' / 'llm_cache.db')
+LLM_CACHE_MEMORY_ENTRIES = _env_int('LLM_CACHE_MEMORY_ENTRIES', 2048)
+LLM_CACHE_TTL = _env_float('LLM_CACHE_TTL', 7 * 24 * 3600)
+
+# Cross-encoder re-ranking in search_qa: pairs per predict batch and cached
+# (query, document) scores
+RERANK_BATCH_SIZE = _env_int('RERANK_BATCH_SIZE', 32)
+RERANK_CACHE_SIZE = _env_int('RERANK_CACHE_SIZE', 10000)
+
+# Query embedding cache shared by retrieval, relevance checks and the semantic cache
+EMBEDDING_CACHE_SIZE = _env_int('EMBEDDING_CACHE_SIZE', 4096)
+
+# Server startup: warm up in the background so /health answers immediately
+BACKGROUND_WARMUP = _env_bool('BACKGROUND_WARMUP', True)
+# Models loaded during warm-up (comma separated names from the model registry)
+WARMUP_MODELS = [name.strip() for name in os.getenv('WARMUP_MODELS', 'bi_encoder').split(',') if name.strip()]
+# The local relevance strategies need the cross-encoder on the first request
+if RELEVANCE_STRATEGY != 'llm' and 'cross_encoder' not in WARMUP_MODELS:
+    WARMUP_MODELS.append('cross_encoder')
+
+# Knowledge-base questions asked verbatim: 'direct' returns the curated answer,
+# 'personalize' adapts it to the patient with one LLM call, 'off' disables the fast path
+EXACT_MATCH_MODE = _env_choice('EXACT_MATCH_MODE', 'direct', ('direct', 'personalize', 'off'))
+
+# Local oncology topic classifier: questions scoring at least the accept probability are
+# on topic, at most the reject probability off topic; only those in between go to the LLM
+TOPIC_ACCEPT_PROB = _env_float('TOPIC_ACCEPT_PROB', 0.9)
+TOPIC_REJECT_PROB = _env_float('TOPIC_REJECT_PROB', 0.1)
+
+# AnswerGenerator: topic check and candidate verification in one structured LLM call,
+# falling back to separate calls when the answer cannot be parsed
+ANSWER_ONE_SHOT = _env_bool('ANSWER_ONE_SHOT', True)
+
+# Retrieval backend used by search_qa: 'chroma', 'numpy' (exact search over a memory-mapped matrix)
+# or 'ivf' (approximate search over k-means lists, for large knowledge bases)
+RETRIEVER_BACKEND = _env_choice('RETRIEVER_BACKEND', 'chroma', ('chroma', 'numpy', 'ivf'))
+NUMPY_INDEX_DTYPE = os.getenv('NUMPY_INDEX_DTYPE', 'float32').strip().lower()
+# IVF index: number of lists (0 = about 4 * sqrt(n)) and lists scanned per query (recall vs. speed)
+IVF_NLIST = _env_int('IVF_NLIST', 0)
+IVF_NPROBE = _env_int('IVF_NPROBE', 8)
+
+# Knowledge-base ingestion: rows read per chunk and documents embedded per batch
+INGEST_CHUNK_SIZE = _env_int('INGEST_CHUNK_SIZE', 5000)
+INGEST_BATCH_SIZE = _env_int('INGEST_BATCH_SIZE', 256)
+# Embedding processes used by ingestion (0 or 1 = in process) and texts per forward pass
+INGEST_EMBED_WORKERS = _env_int('INGEST_EMBED_WORKERS', 0)
+INGEST_EMBED_BATCH_SIZE = _env_int('INGEST_EMBED_BATCH_SIZE', 64)
+# On-disk cache of document embeddings reused across ingestion runs
+INGEST_EMBEDDING_CACHE = _env_bool('INGEST_EMBEDDING_CACHE', True)
+EMBEDDING_DISK_CACHE_DIR = Path(os.getenv('EMBEDDING_DISK_CACHE_DIR') or Path(__file__).resolve().parents[2] / 'data' / 'embedding_cache')
@@ -0,0 +1,100 @@
+"""Batched, optionally multi-process document embedding for ingestion."""
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .embedding_cache import DiskEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+class BatchEmbedder:
+    """
+    Embeds documents in fixed-size batches, across worker processes when asked.
+
+    With `workers` > 1 the texts are spread over a sentence-transformers
+    multi-process pool; results come back in input order. With a disk
+    cache, texts embedded by an earlier run are read back instead of being
+    re-encoded. The class also
+    implements the LangChain embeddings interface, so it can be handed to
+    Chroma as the embedding function of an ingestion run.
+    """
+
+    def __init__(self, model: Any, workers: int = 0, batch_size: int = 64, cache: Optional[DiskEmbeddingCache] = None):
+        self.model = model
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self._pool: Optional[Dict[str, Any]] = None
+        self._sentences = 0
+        self._seconds = 0.0
+
+    def _get_pool(self) -> Optional[Dict[str, Any]]:
+        if self.workers <= 1:
+            return None
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=['cpu'] * self.workers)
+            logger.info(f"Started embedding pool with {self.workers} worker processes")
+        return self._pool
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts, preserving their order.
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 embeddings
+        """
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        if self.cache is not None:
+            return self.cache.embed(texts, self._encode)
+        return self._encode(texts)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        pool = self._get_pool()
+        if pool is not None:
+            # Split the texts so every worker gets a share, a few batches at most
+            chunk_size = max(1, min(self.batch_size * 4, math.ceil(len(texts) / self.workers)))
+            embeddings = self.model.encode_multi_process(
+                texts, pool, batch_size=self.batch_size, chunk_size=chunk_size
+            )
+        else:
+            embeddings = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        self._seconds += time.perf_counter() - start
+        self._sentences += len(texts)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return embedding throughput so far."""
+        stats = {
+            "workers": max(self.workers, 1),
+            "batch_size": self.batch_size,
+            "sentences": self._sentences,
+            "seconds": round(self._seconds, 3),
+            "sentences_per_second": round(self._sentences / self._seconds, 1) if self._seconds else 0.0,
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def close(self) -> None:
+        """Stop the worker processes, if any."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def __enter__(self) -> "BatchEmbedder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,162 @@
+"""
+Compare query latency and agreement of the retrieval backends.
+
+Usage:
+    python -m src.helpers.benchmark_retrieval --queries 200 --k 5 --repeat 3
+    python -m src.helpers.benchmark_retrieval --synthetic 1000000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import logging
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.helpers.document_retriever import get_vector_store
+from src.helpers.model_registry import get_bi_encoder
+from src.helpers.ivf_index import IVFIndex
+from src.helpers.numpy_store import _normalize_rows, get_numpy_index, top_k
+
+logger = logging.getLogger(__name__)
+
+def _latency_summary(timings: List[float]) -> Dict[str, float]:
+    values = np.asarray(timings) * 1000
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+    }
+
+def run_benchmark(num_queries: int = 200, k: int = 5, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Time both backends on the same precomputed query embeddings.
+
+    Queries are the first `num_queries` knowledge-base documents, so model
+    encoding time is excluded and only the search itself is measured.
+
+    Args:
+        num_queries: Number of queries to run
+        k: Number of results per query
+        repeat: Times each query is run per backend
+
+    Returns:
+        Latency summary per backend and the mean overlap@k between them
+    """
+    numpy_index = get_numpy_index()
+    vector_store = get_vector_store()
+    texts = [numpy_index.documents[i].page_content for i in range(min(num_queries, len(numpy_index)))]
+    queries = get_bi_encoder().encode(texts, batch_size=64)
+
+    chroma_timings, numpy_timings, overlaps = [], [], []
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chroma_docs = vector_store.similarity_search_by_vector(query.tolist(), k=k)
+            chroma_timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            numpy_docs = numpy_index.search_by_vector(query, k=k)
+            numpy_timings.append(time.perf_counter() - start)
+
+        chroma_contents = {doc.page_content for doc in chroma_docs}
+        numpy_contents = {doc.page_content for doc, _ in numpy_docs}
+        overlaps.append(len(chroma_contents & numpy_contents) / max(len(numpy_contents), 1))
+
+    return {
+        "chroma": _latency_summary(chroma_timings),
+        "numpy": _latency_summary(numpy_timings),
+        "agreement": {f"overlap@{k}": float(np.mean(overlaps)), "documents": float(len(numpy_index))},
+    }
+
+def synthetic_corpus(size: int, dim: int = 384, clusters: int = 1000, seed: int = 0, chunk_size: int = 100000) -> np.ndarray:
+    """Normalized float32 vectors drawn around random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    corpus = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, chunk_size):
+        rows = min(chunk_size, size - start)
+        noise = rng.standard_normal((rows, dim), dtype=np.float32)
+        corpus[start:start + rows] = _normalize_rows(centres[rng.integers(clusters, size=rows)] + noise)
+    return corpus
+
+def run_synthetic_benchmark(
+    size: int = 100000,
+    dim: int = 384,
+    num_queries: int = 200,
+    k: int = 5,
+    nprobes: Sequence[int] = (1, 4, 8, 16, 32),
+    nlist: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """
+    Recall@k and latency of the IVF index against exact search on a synthetic corpus.
+
+    Queries are perturbed corpus vectors; the exact top k of each query is
+    the ground truth.
+
+    Args:
+        size: Number of corpus vectors
+        dim: Embedding dimension
+        num_queries: Number of queries
+        k: Number of results per query
+        nprobes: nprobe values to evaluate
+        nlist: Number of IVF lists (0 uses the default)
+
+    Returns:
+        Latency summary of exact search and recall/latency per nprobe
+    """
+    rng = np.random.default_rng(1)
+    corpus = synthetic_corpus(size, dim)
+    queries = _normalize_rows(
+        corpus[rng.integers(size, size=num_queries)] + 0.05 * rng.standard_normal((num_queries, dim), dtype=np.float32)
+    )
+
+    exact_timings, truth = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(set(top_k(corpus @ query, k).tolist()))
+        exact_timings.append(time.perf_counter() - start)
+    results = {"exact": _latency_summary(exact_timings)}
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        IVFIndex.build(corpus, index_dir, nlist=nlist or None)
+        build_seconds = time.perf_counter() - start
+        index = IVFIndex(index_dir)
+        results["exact"]["ivf_build_s"] = build_seconds
+        for nprobe in nprobes:
+            timings, recalls = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                ids, _ = index.search_ids(query, k, nprobe)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(expected & set(ids.tolist())) / k)
+            results[f"ivf nprobe={nprobe}"] = {
+                f"recall@{k}": float(np.mean(recalls)),
+                **_latency_summary(timings),
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the retrieval backends")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query and backend")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark the IVF index on a synthetic corpus of this size instead of the knowledge base")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension of the synthetic corpus")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="nprobe values to evaluate")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = about 4 * sqrt(n))")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        results = run_synthetic_benchmark(args.synthetic, args.dim, args.queries, args.k, args.nprobe, args.nlist)
+    else:
+        results = run_benchmark(args.queries, args.k, args.repeat)
+    for backend, summary in results.items():
+        values = ", ".join(f"{name}={value:.3f}" for name, value in summary.items())
+        print(f"{backend:<16} {values}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
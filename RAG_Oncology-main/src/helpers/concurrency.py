@@ -0,0 +1,127 @@
+"""Helpers to run independent LLM calls concurrently with a bounded fan-out."""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+async def gather_bounded(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    limit: int,
+    timeout: Optional[float] = None,
+    default: Any = None
+) -> List[Any]:
+    """
+    Await func(item) for every item with at most `limit` calls in flight.
+
+    Args:
+        func: Coroutine function called once per item
+        items: Inputs, one call each
+        limit: Maximum number of concurrent calls
+        timeout: Per-call timeout in seconds (None for no timeout)
+        default: Result used for calls that time out or raise
+
+    Returns:
+        Results in the same order as `items`
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(index: int, item: Any) -> Any:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(func(item), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Call {index} timed out after {timeout}s")
+            except Exception as e:
+                logger.error(f"Call {index} failed: {str(e)}")
+            return default
+
+    return list(await asyncio.gather(*(run(i, item) for i, item in enumerate(items))))
+
+def map_bounded(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    limit: int,
+    timeout: Optional[float] = None,
+    default: Any = None
+) -> List[Any]:
+    """
+    Thread-based counterpart of gather_bounded for blocking callables.
+
+    At most `limit` calls run at once. Each call's timeout starts when that
+    call starts, not when it is queued, as in gather_bounded. A call that
+    overruns is abandoned (its thread cannot be interrupted): `default` is
+    used in its place and its slot goes to the next queued call.
+
+    Args:
+        func: Blocking callable called once per item
+        items: Inputs, one call each
+        limit: Maximum number of concurrent calls
+        timeout: Per-call timeout in seconds (None for no timeout)
+        default: Result used for calls that time out or raise
+
+    Returns:
+        Results in the same order as `items`
+    """
+    if not items:
+        return []
+
+    count = len(items)
+    results = [default] * count
+    finished = [False] * count
+    started: List[Optional[float]] = [None] * count
+    slots = threading.Semaphore(max(1, min(limit, count)))
+    condition = threading.Condition()
+
+    def run(index: int, item: Any, context: contextvars.Context) -> None:
+        slots.acquire()
+        with condition:
+            started[index] = time.monotonic()
+            condition.notify_all()
+        try:
+            value, error = context.run(func, item), None
+        except Exception as e:
+            value, error = default, e
+        with condition:
+            # A call abandoned on timeout already gave its slot back
+            if not finished[index]:
+                if error is not None:
+                    logger.error(f"Call {index} failed: {str(error)}")
+                results[index] = value
+                finished[index] = True
+                slots.release()
+            condition.notify_all()
+
+    # One thread per call; the semaphore bounds how many run at once
+    executor = ThreadPoolExecutor(max_workers=count)
+    try:
+        for index, item in enumerate(items):
+            # Each call runs in a copy of the caller's context so context-local state follows it
+            executor.submit(run, index, item, contextvars.copy_context())
+
+        with condition:
+            while not all(finished):
+                now = time.monotonic()
+                next_deadline = None
+                if timeout is not None:
+                    for index in range(count):
+                        if finished[index] or started[index] is None:
+                            continue
+                        deadline = started[index] + timeout
+                        if deadline <= now:
+                            logger.warning(f"Call {index} timed out after {timeout}s")
+                            finished[index] = True
+                            slots.release()
+                        elif next_deadline is None or deadline < next_deadline:
+                            next_deadline = deadline
+                if not all(finished):
+                    condition.wait(None if next_deadline is None else next_deadline - now)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
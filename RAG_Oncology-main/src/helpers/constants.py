@@ -1,11 +1,23 @@
 """Constants and shared configurations for the helpers module."""
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
-# Initialize models
-bi_encoder = SentenceTransformer('all-MiniLM-L6-v2')
+# Models, loaded on first use through the model registry
+BI_ENCODER_MODEL = 'all-MiniLM-L6-v2'
+CROSS_ENCODER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
 
 # Path setup
 SCRIPT_DIR = Path(__file__).parent
 DATA_FILE = SCRIPT_DIR / '../../data/data_oncology.xlsx'
 VECTOR_STORE_DIR = SCRIPT_DIR / '../../chroma_db_oncology'
+NUMPY_INDEX_DIR = SCRIPT_DIR / '../../numpy_index_oncology'
+INGEST_CHECKPOINT_FILE = VECTOR_STORE_DIR / 'ingest_checkpoint.jsonl'
+EXACT_INDEX_FILE = VECTOR_STORE_DIR / 'exact_questions.json'
+TOPIC_CLASSIFIER_FILE = VECTOR_STORE_DIR / 'topic_classifier.npz'
+RELEVANCE_CALIBRATION_FILE = VECTOR_STORE_DIR / 'relevance_calibration.json'
+
+def __getattr__(name):
+    # Backwards compatibility: `bi_encoder` used to be loaded at import time
+    if name == 'bi_encoder':
+        from .model_registry import get_bi_encoder
+        return get_bi_encoder()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,208 @@
+"""Block-wise near-duplicate detection over question embeddings."""
+import logging
+from typing import List, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def similar_pairs(embeddings: np.ndarray, threshold: float, block_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all pairs (i, j), i < j, whose dot product is above `threshold`.
+
+    The similarity matrix is computed one block_size x block_size tile at a
+    time over the upper triangle only, so memory stays bounded whatever the
+    number of rows.
+
+    Args:
+        embeddings: (n, dim) float32 embeddings
+        threshold: Minimum similarity of a pair
+        block_size: Rows and columns per tile
+
+    Returns:
+        Row and column indices of the pairs, sorted by row then column
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    n = len(embeddings)
+    rows, cols = [], []
+    for row_start in range(0, n, block_size):
+        row_block = embeddings[row_start:row_start + block_size]
+        for col_start in range(row_start, n, block_size):
+            tile = row_block @ embeddings[col_start:col_start + block_size].T
+            if col_start == row_start:
+                # Keep only j > i on the diagonal tile
+                tile[np.tril_indices(len(tile), m=tile.shape[1])] = -np.inf
+            i, j = np.nonzero(tile > threshold)
+            rows.append(i + row_start)
+            cols.append(j + col_start)
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order]
+
+def similar_pairs_between(
+    left: np.ndarray,
+    right: np.ndarray,
+    threshold: float,
+    block_size: int = 4096
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all pairs (i, j) of a row of `left` and a row of `right` whose dot product is above `threshold`.
+
+    Args:
+        left: (n, dim) embeddings
+        right: (m, dim) embeddings, any float dtype
+        threshold: Minimum similarity of a pair
+        block_size: Rows and columns per tile
+
+    Returns:
+        Row indices into `left` and `right`, sorted by left row then right row
+    """
+    left = np.asarray(left, dtype=np.float32)
+    rows, cols = [], []
+    for row_start in range(0, len(left), block_size):
+        row_block = left[row_start:row_start + block_size]
+        for col_start in range(0, len(right), block_size):
+            col_block = np.asarray(right[col_start:col_start + block_size], dtype=np.float32)
+            i, j = np.nonzero(row_block @ col_block.T > threshold)
+            rows.append(i + row_start)
+            cols.append(j + col_start)
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order]
+
+def near_duplicates(
+    embeddings: np.ndarray,
+    answer_lengths: np.ndarray,
+    threshold: float = 0.85,
+    block_size: int = 4096
+) -> np.ndarray:
+    """
+    Mask of rows to drop as near-duplicates, keeping the longer answer.
+
+    Rows are visited in order. A kept row i is compared with every later
+    row j that is still kept: if i's answer is shorter, i is dropped,
+    otherwise j is. Only the pairs above the threshold are visited, so the
+    interpreter work grows with the number of duplicates, not with n².
+
+    Args:
+        embeddings: (n, dim) question embeddings
+        answer_lengths: (n,) length of each answer
+        threshold: Similarity above which two questions are duplicates
+        block_size: Tile size used to compute the similarities
+
+    Returns:
+        np.ndarray: Boolean mask, True for rows to drop
+    """
+    answer_lengths = np.asarray(answer_lengths)
+    dropped = np.zeros(len(answer_lengths), dtype=bool)
+    rows, cols = similar_pairs(embeddings, threshold, block_size)
+    if len(rows) == 0:
+        return dropped
+
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+    for start, end in zip(starts, ends):
+        i = rows[start]
+        if dropped[i]:
+            continue
+        candidates = cols[start:end]
+        candidates = candidates[~dropped[candidates]]
+        if len(candidates) == 0:
+            continue
+        longer = answer_lengths[candidates] > answer_lengths[i]
+        if longer.any():
+            dropped[i] = True
+        dropped[candidates[~longer]] = True
+
+    logger.info(f"Found {len(rows)} similar pairs, dropping {int(dropped.sum())} rows")
+    return dropped
+
+class KeptQuestions:
+    """
+    Questions kept by earlier chunks of a streamed deduplication.
+
+    Each new chunk is compared with every question kept so far, with the
+    same keep-the-longer-answer rule as `near_duplicates`: a row whose answer
+    is not longer than a similar kept one is dropped, otherwise it replaces
+    the kept rows it duplicates. Embeddings are held as float16 to bound
+    memory on large knowledge bases.
+    """
+
+    def __init__(self, threshold: float = 0.85, block_size: int = 4096):
+        self.threshold = threshold
+        self.block_size = block_size
+        self._blocks: List[np.ndarray] = []
+        self._answer_lengths = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._ids: List[str] = []
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    def _similar_kept(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairs (chunk row, kept row) above the threshold, sorted by chunk row."""
+        rows, cols = [], []
+        offset = 0
+        for block in self._blocks:
+            i, j = similar_pairs_between(embeddings, block, self.threshold, self.block_size)
+            rows.append(i)
+            cols.append(j + offset)
+            offset += len(block)
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        order = np.lexsort((cols, rows))
+        return rows[order], cols[order]
+
+    def add_chunk(self, embeddings: np.ndarray, answer_lengths: np.ndarray, ids: Sequence[str]) -> np.ndarray:
+        """
+        Deduplicate a chunk against the kept questions and keep its survivors.
+
+        The chunk itself must already be free of near-duplicates.
+
+        Args:
+            embeddings: (n, dim) question embeddings of the chunk
+            answer_lengths: (n,) length of each answer
+            ids: Document ID of each row
+
+        Returns:
+            np.ndarray: Boolean mask, True for chunk rows to drop
+        """
+        answer_lengths = np.asarray(answer_lengths)
+        dropped = np.zeros(len(answer_lengths), dtype=bool)
+        replaced = 0
+        if self._blocks and len(answer_lengths):
+            rows, cols = self._similar_kept(embeddings)
+            for i in np.unique(rows):
+                kept = cols[np.searchsorted(rows, i, 'left'):np.searchsorted(rows, i, 'right')]
+                kept = kept[self._alive[kept]]
+                if len(kept) == 0:
+                    continue
+                if (self._answer_lengths[kept] >= answer_lengths[i]).any():
+                    dropped[i] = True
+                else:
+                    self._alive[kept] = False
+                    replaced += len(kept)
+            if dropped.any() or replaced:
+                logger.info(
+                    f"Against earlier chunks: dropping {int(dropped.sum())} rows, "
+                    f"replacing {replaced} kept rows with longer answers"
+                )
+
+        survivors = ~dropped
+        self._blocks.append(np.asarray(embeddings, dtype=np.float16)[survivors])
+        self._answer_lengths = np.concatenate([self._answer_lengths, answer_lengths[survivors]])
+        self._alive = np.concatenate([self._alive, np.ones(int(survivors.sum()), dtype=bool)])
+        self._ids.extend(doc_id for doc_id, keep in zip(ids, survivors) if keep)
+        return dropped
+
+    def kept_ids(self) -> Set[str]:
+        """Document IDs of the rows still kept."""
+        return {doc_id for doc_id, alive in zip(self._ids, self._alive) if alive}
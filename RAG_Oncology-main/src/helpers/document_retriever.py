@@ -1,27 +1,21 @@
 from langchain_chroma import Chroma
 from langchain.schema import Document
-from sentence_transformers import CrossEncoder
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 from pathlib import Path
 
 # Import from constants to share models and paths
-from .constants import bi_encoder, VECTOR_STORE_DIR
+from .constants import VECTOR_STORE_DIR
+from .embedding_cache import query_embedding_cache
+from .model_registry import get_bi_encoder, get_cross_encoder
+from .kb_version import VersionedResource
+from .numpy_store import IndexUnavailableError
+from src.config.settings import RETRIEVER_BACKEND
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize cross-encoder for re-ranking
-cross_encoder = None
-
-def get_cross_encoder():
-    """Lazy load the cross-encoder to avoid loading it if not needed."""
-    global cross_encoder
-    if cross_encoder is None:
-        cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-    return cross_encoder
-
 class SentenceTransformerEmbeddings:
     def __init__(self, model):
         self.model = model
@@ -30,7 +24,8 @@ class SentenceTransformerEmbeddings:
         return self.model.encode(texts).tolist()
     
     def embed_query(self, text):
-        return self.model.encode(text).tolist()
+        # Queries are embedded at several points of a request; encode each once
+        return query_embedding_cache.encode(self.model, text).tolist()
 
 
 def format_result(doc: Document) -> Dict[str, Any]:
@@ -51,16 +46,80 @@ def format_result(doc: Document) -> Dict[str, Any]:
         "answer": answer,
     }
 
-def get_vector_store() -> Chroma:
-    """Initialize and return the Chroma vector store."""
-    embeddings = SentenceTransformerEmbeddings(bi_encoder)
+def _open_vector_store() -> Chroma:
+    embeddings = SentenceTransformerEmbeddings(get_bi_encoder())
     return Chroma(
         collection_name="oncology_qa",
         embedding_function=embeddings,
         persist_directory=str(VECTOR_STORE_DIR)
     )
 
-def search_qa(query: str, k: int = 5, use_cross_encoder: bool = False) -> List[Dict[str, Any]]:
+# Shared store handle, reopened when the knowledge base is rebuilt
+_vector_store = VersionedResource(_open_vector_store, name="vector store")
+
+def get_vector_store() -> Chroma:
+    """Return the shared Chroma vector store, opening it on first use."""
+    return _vector_store.get()
+
+def reset_vector_store() -> None:
+    """Drop the shared store handle so the next call reopens it."""
+    _vector_store.reset()
+
+def dump_documents(limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+    """
+    Return a page of the documents stored in the knowledge base.
+    
+    Meant for diagnostics only; never call it on the query path.
+    
+    Args:
+        limit: Maximum number of documents to return
+        offset: Number of documents to skip
+        
+    Returns:
+        Dict with the collection size and the requested documents
+    """
+    vector_store = get_vector_store()
+    page = vector_store.get(limit=limit, offset=offset, include=["documents", "metadatas"])
+    documents = [
+        {"id": doc_id, "content": content, "metadata": metadata}
+        for doc_id, content, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+    ]
+    return {
+        "total": vector_store._collection.count(),
+        "limit": limit,
+        "offset": offset,
+        "documents": documents,
+    }
+
+def _similarity_search_with_score(query: str, k: int) -> List[Tuple[Document, float]]:
+    """Top k documents of the configured backend with their cosine similarity to the query."""
+    if RETRIEVER_BACKEND == 'numpy':
+        from .numpy_store import get_numpy_index
+        return get_numpy_index().similarity_search_with_score(query, k=k)
+    if RETRIEVER_BACKEND == 'ivf':
+        from .ivf_index import get_ivf_index
+        return get_ivf_index().similarity_search_with_score(query, k=k)
+    # Chroma returns squared L2 distances; the embeddings are unit length, so cos = 1 - d / 2
+    results = get_vector_store().similarity_search_with_score(query, k=k)
+    return [(doc, 1.0 - float(distance) / 2.0) for doc, distance in results]
+
+def load_search_backend() -> None:
+    """
+    Open the configured retriever backend so a missing index fails at startup.
+
+    Raises:
+        IndexUnavailableError: If the NumPy or IVF index is missing or stale
+    """
+    if RETRIEVER_BACKEND == 'numpy':
+        from .numpy_store import get_numpy_index
+        get_numpy_index()
+    elif RETRIEVER_BACKEND == 'ivf':
+        from .ivf_index import get_ivf_index
+        get_ivf_index()
+    else:
+        get_vector_store()
+
+def search_qa(query: str, k: int = 5, use_cross_encoder: bool = False, raise_errors: bool = False) -> List[Dict[str, Any]]:
     """
     Search the QA knowledge base for relevant answers.
     
@@ -68,43 +127,65 @@ def search_qa(query: str, k: int = 5, use_cross_encoder: bool = False) -> List[D
         query: The search query
         k: Number of results to return
         use_cross_encoder: Whether to use cross-encoder for re-ranking
+        raise_errors: Re-raise search failures instead of returning no results
         
     Returns:
-        List of dictionaries containing question, answer, and score
+        List of dictionaries containing question, answer, the cosine similarity
+        `score` and, when re-ranked, the `cross_encoder_score`
+        
+    Raises:
+        IndexUnavailableError: If the configured NumPy or IVF index is missing or stale
+        Exception: Any search failure, when `raise_errors` is set
     """
     try:
         
         logger.info(f"Searching knowledge base for: {query}")
         
-        vector_store = get_vector_store()
-        docs = vector_store.get()
-        logger.info(f"printing all the doc that exist in vector store")
-        logger.info('---------------------------------')
-        for i, doc in enumerate(docs['documents']):
-            print(f"\nDocument {i+1}:")
-            print(doc)
-        logger.info('---------------------------------')
         fetch_count = k * 3 if use_cross_encoder else k
-        initial_results = vector_store.similarity_search(query, k=fetch_count)
+        initial_results = _similarity_search_with_score(query, fetch_count)
         
         if not initial_results:
             return []
             
         if not use_cross_encoder:
-            return [format_result(doc) for doc in initial_results[:k]]
+            return [dict(format_result(doc), score=score) for doc, score in initial_results[:k]]
         
+        # Re-rank with the cross-encoder, keeping only the k best candidates
+        from .reranker import get_reranker
+        return [
+            dict(format_result(doc), score=score, cross_encoder_score=cross_score)
+            for doc, score, cross_score in get_reranker().rerank(query, initial_results, k)
+        ]
         
-        # Re-rank with cross-encoder
-        query_doc_pairs = [(query, doc.page_content) for doc in initial_results]
-        cross_encoder = get_cross_encoder()
-        scores = cross_encoder.predict(query_doc_pairs)
-        
-        # Combine results with scores and sort
-        scored_results = zip(initial_results, scores)
-        top_results = sorted(scored_results, key=lambda x: x[1], reverse=True)[:k]
-        
-        return [format_result(doc) for doc in top_results]
-        
+    except IndexUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Search failed for query '{query}': {str(e)}", exc_info=True)
-        return []
\ No newline at end of file
+        if raise_errors:
+            raise
+        return []
+
+def search_qa_many(queries: List[str], k: int = 5, use_cross_encoder: bool = False) -> List[List[Dict[str, Any]]]:
+    """
+    Search the QA knowledge base for several queries at once.
+    
+    Candidates of every query are re-ranked together, so the cross-encoder
+    runs one batched pass for the whole workload.
+    
+    Args:
+        queries: The search queries
+        k: Number of results per query
+        use_cross_encoder: Whether to use cross-encoder for re-ranking
+        
+    Returns:
+        One list of results per query, as returned by search_qa
+    """
+    if not use_cross_encoder:
+        return [search_qa(query, k=k) for query in queries]
+    
+    from .reranker import get_reranker
+    candidates = [_similarity_search_with_score(query, k * 3) for query in queries]
+    return [
+        [dict(format_result(doc), score=score, cross_encoder_score=cross_score) for doc, score, cross_score in ranked]
+        for ranked in get_reranker().rerank_many(queries, candidates, k)
+    ]
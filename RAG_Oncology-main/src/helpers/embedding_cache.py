@@ -0,0 +1,266 @@
+"""Process-wide LRU cache of query embeddings and on-disk cache of document embeddings."""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import BI_ENCODER_MODEL
+from .kb_version import VersionedResource
+from src.config.settings import EMBEDDING_CACHE_SIZE, EMBEDDING_DISK_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of normalized text -> float32 embedding.
+
+    Keys include the model, so texts are only shared between call sites that
+    use the same encoder. Text is whitespace-normalized, and lowercased when
+    the model's tokenizer lowercases anyway. Concurrent misses on the same
+    text wait for a single encode instead of encoding it twice.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, str], np.ndarray]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str], threading.Event] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def normalize(model: Any, text: str) -> str:
+        """Normalize text so trivially different inputs share an entry."""
+        text = " ".join(str(text).split())
+        tokenizer = getattr(model, "tokenizer", None)
+        if getattr(tokenizer, "do_lower_case", False):
+            text = text.lower()
+        return text
+
+    def encode(self, model: Any, text: str) -> np.ndarray:
+        """
+        Return the embedding of a text, encoding it only on a cache miss.
+
+        Args:
+            model: SentenceTransformer used to encode the text
+            text: Text to embed
+
+        Returns:
+            np.ndarray: Read-only float32 embedding
+        """
+        normalized = self.normalize(model, text)
+        key = (id(model), normalized)
+
+        while True:
+            with self._lock:
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return embedding
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    self._misses += 1
+                    break
+            # Another thread is encoding the same text; use its result
+            pending.wait()
+
+        try:
+            embedding = np.asarray(model.encode(normalized), dtype=np.float32)
+            embedding.setflags(write=False)
+            with self._lock:
+                self._entries[key] = embedding
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return embedding
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+# Shared by every component that embeds queries
+query_embedding_cache = QueryEmbeddingCache(max_size=EMBEDDING_CACHE_SIZE)
+
+class DiskEmbeddingCache:
+    """
+    Persistent text -> embedding cache for one model.
+
+    Vectors are appended as raw float16 rows to `vectors.f16` and read back
+    through a memory map; `index.tsv` maps the SHA-256 of each text to its
+    row. Rows are written before their index lines, and a partial row or
+    index line left by an interrupted run is dropped on the next load, so an
+    index entry never points at a missing or misaligned vector.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str):
+        self.cache_dir = Path(cache_dir) / re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.model_name = model_name
+        self.vectors_path = self.cache_dir / 'vectors.f16'
+        self.index_path = self.cache_dir / 'index.tsv'
+        self.meta_path = self.cache_dir / 'meta.json'
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._count = 0
+        self._matrix: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.meta_path.exists():
+            return
+        self._dim = json.loads(self.meta_path.read_text())['dim']
+        row_bytes = self._dim * 2
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        self._count = size // row_bytes
+        if size != self._count * row_bytes:
+            # An interrupted write left a partial row; drop it so new rows stay aligned
+            logger.warning(f"Embedding cache for {self.model_name}: dropping {size - self._count * row_bytes} bytes of a partial row")
+            with open(self.vectors_path, 'r+b') as file:
+                file.truncate(self._count * row_bytes)
+
+        lines: List[str] = []
+        stale = False
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    key, _, row = line.rstrip('\n').partition('\t')
+                    if line.endswith('\n') and row.isdigit() and int(row) < self._count:
+                        self._rows[key] = int(row)
+                        lines.append(line)
+                    else:
+                        stale = True
+        if stale:
+            # Rows past the vectors (or a partial last line) would otherwise be
+            # matched with the rows appended next
+            tmp_path = self.index_path.with_suffix('.tsv.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.writelines(lines)
+            os.replace(tmp_path, self.index_path)
+        logger.info(f"Embedding cache for {self.model_name}: {len(self._rows)} vectors")
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+            self.meta_path.write_text(json.dumps({'model': self.model_name, 'dim': self._dim, 'dtype': 'float16'}))
+        # Write at the row the index will record, whatever the file size is
+        with open(self.vectors_path, 'r+b' if self.vectors_path.exists() else 'wb') as file:
+            file.seek(self._count * self._dim * 2)
+            file.write(np.ascontiguousarray(vectors, dtype=np.float16).tobytes())
+        with open(self.index_path, 'a', encoding='utf-8') as file:
+            file.writelines(f"{key}\t{self._count + i}\n" for i, key in enumerate(keys))
+        for i, key in enumerate(keys):
+            self._rows[key] = self._count + i
+        self._count += len(keys)
+        self._matrix = None
+
+    def _vectors(self) -> np.memmap:
+        if self._matrix is None:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(self._count, self._dim))
+        return self._matrix
+
+    def embed(self, texts: Sequence[str], compute: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings of `texts`, computing only the ones not cached yet.
+
+        Freshly computed vectors go through the same float16 rounding as
+        cached ones, so results do not depend on the cache state.
+
+        Args:
+            texts: Texts to embed
+            compute: Embeds a list of texts, returning a (n, dim) array
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 embeddings
+        """
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self._hits += len(keys) - len(missing)
+            self._misses += len(missing)
+
+            if missing:
+                vectors = np.asarray(compute(list(missing.values())), dtype=np.float32)
+                self._append(list(missing), vectors)
+            if not keys:
+                return np.empty((0, self._dim or 0), dtype=np.float32)
+            rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+            return np.asarray(self._vectors()[rows], dtype=np.float32)
+
+    def lookup(self, texts: Sequence[str]) -> Tuple[Optional[np.ndarray], List[int]]:
+        """
+        Read the cached embeddings of `texts` without computing anything.
+
+        Returns:
+            (len(texts), dim) float32 array with zero rows for the texts that
+            are not cached (None if the cache is empty), and the positions of
+            those texts
+        """
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            missing = [i for i, key in enumerate(keys) if key not in self._rows]
+            self._hits += len(keys) - len(missing)
+            self._misses += len(missing)
+            if self._dim is None:
+                return None, list(range(len(keys)))
+            embeddings = np.zeros((len(keys), self._dim), dtype=np.float32)
+            found = [i for i, key in enumerate(keys) if key in self._rows]
+            if found:
+                rows = np.fromiter((self._rows[keys[i]] for i in found), dtype=np.int64, count=len(found))
+                embeddings[found] = self._vectors()[rows]
+            return embeddings, missing
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._rows),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "bytes": self._count * (self._dim or 0) * 2,
+            }
+
+# Question and document embeddings written by ingestion, reopened when the knowledge base is rebuilt
+_document_embedding_cache = VersionedResource(
+    lambda: DiskEmbeddingCache(EMBEDDING_DISK_CACHE_DIR, BI_ENCODER_MODEL),
+    name="document embedding cache"
+)
+
+def get_document_embedding_cache() -> DiskEmbeddingCache:
+    """Return the shared on-disk embedding cache of the bi-encoder."""
+    return _document_embedding_cache.get()
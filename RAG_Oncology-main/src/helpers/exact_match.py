@@ -0,0 +1,109 @@
+"""Hash index of the knowledge-base questions for verbatim and near-verbatim matches."""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .constants import EXACT_INDEX_FILE
+from .kb_version import VersionedResource
+
+logger = logging.getLogger(__name__)
+
+def normalize_question(text: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a question."""
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return " ".join(text.split())
+
+def question_key(text: str) -> str:
+    return hashlib.sha256(normalize_question(text).encode('utf-8')).hexdigest()
+
+class ExactQuestionIndex:
+    """Maps normalized question hashes to the curated question and answer."""
+
+    def __init__(self, entries: Dict[str, Dict[str, str]]):
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, question: str) -> Optional[Dict[str, str]]:
+        return self.entries.get(question_key(question))
+
+    @classmethod
+    def load(cls, path: Path = EXACT_INDEX_FILE) -> "ExactQuestionIndex":
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            logger.warning(f"No exact-question index at {path}, exact matching disabled")
+            entries = {}
+        logger.info(f"Loaded exact-question index with {len(entries)} questions")
+        return cls(entries)
+
+    @staticmethod
+    def build_from_collection(collection: Any, path: Path = EXACT_INDEX_FILE, page_size: int = 5000) -> int:
+        """
+        Write the index from the documents stored in a Chroma collection.
+
+        Args:
+            collection: Chroma collection (e.g. `vector_store._collection`)
+            path: Index file
+            page_size: Documents fetched from Chroma per call
+
+        Returns:
+            int: Number of indexed questions
+        """
+        # Ingestion-only dependencies; the lookup path stays light to import
+        from langchain.schema import Document
+        from .document_retriever import format_result
+
+        entries: Dict[str, Dict[str, str]] = {}
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(limit=page_size, offset=offset, include=['documents'])
+            for doc_id, content in zip(page['ids'], page['documents']):
+                result = format_result(Document(page_content=content or ""))
+                if not result['question'] or not result['answer']:
+                    continue
+                entries.setdefault(question_key(result['question']), {
+                    'id': doc_id,
+                    'question': result['question'],
+                    'answer': result['answer'],
+                })
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.info(f"Exact-question index built with {len(entries)} questions")
+        return len(entries)
+
+# Shared index, reloaded when the knowledge base is rebuilt
+_exact_index = VersionedResource(lambda: ExactQuestionIndex.load(EXACT_INDEX_FILE), name="exact-question index")
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+def lookup_exact_question(question: str) -> Optional[Dict[str, str]]:
+    """Return the curated entry whose question matches `question`, if any."""
+    entry = _exact_index.get().lookup(question)
+    with _stats_lock:
+        _stats['hits' if entry else 'misses'] += 1
+    return entry
+
+def exact_match_stats() -> Dict[str, Any]:
+    """Return hit statistics of the exact-question lookups."""
+    with _stats_lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'hit_rate': round(_stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,131 @@
+"""Chunked readers for knowledge-base source files and a resumable ingestion checkpoint."""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('Question', 'Answer')
+
+def _read_excel_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def _read_parquet_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet sources requires pyarrow (pip install pyarrow)") from e
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=list(REQUIRED_COLUMNS)):
+        yield batch.to_pandas()
+
+def iter_source_chunks(path: Path, chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """
+    Read a Q&A source file as DataFrames of at most `chunk_size` rows.
+
+    Supported formats: .xlsx, .csv, .parquet and .jsonl. Every chunk has
+    non-empty 'Question' and 'Answer' columns.
+
+    Args:
+        path: Source file
+        chunk_size: Rows per chunk
+
+    Raises:
+        ValueError: If the format is not supported or the columns are missing
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in ('.xlsx', '.xlsm'):
+        chunks = _read_excel_chunks(path, chunk_size)
+    elif suffix == '.csv':
+        chunks = pd.read_csv(path, chunksize=chunk_size)
+    elif suffix == '.parquet':
+        chunks = _read_parquet_chunks(path, chunk_size)
+    elif suffix in ('.jsonl', '.ndjson'):
+        chunks = pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported source format: {path.suffix}")
+
+    for chunk in chunks:
+        missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Source {path} is missing columns: {', '.join(missing)}")
+        yield chunk.dropna(subset=list(REQUIRED_COLUMNS))
+
+class IngestCheckpoint:
+    """
+    Append-only record of the chunks already written to the vector store.
+
+    The first line identifies the source (path, size, mtime and chunk size);
+    each following line lists a finished chunk and the document IDs it
+    produced. A checkpoint for a different source or chunk size is ignored.
+    """
+
+    def __init__(self, path: Path, source: Path, chunk_size: int):
+        self.path = Path(path)
+        stat = Path(source).stat()
+        self.signature = {
+            'source': str(Path(source).resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'chunk_size': chunk_size,
+        }
+        self.done: Set[int] = set()
+        self.document_ids: Set[str] = set()
+
+    def load(self) -> bool:
+        """Load progress of a previous run on the same source; returns True if there was any."""
+        if not self.path.exists():
+            return False
+        with open(self.path, 'r', encoding='utf-8') as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+        if not lines or lines[0] != self.signature:
+            logger.info("Ignoring ingestion checkpoint of a different source")
+            return False
+        for entry in lines[1:]:
+            self.done.add(entry['chunk'])
+            self.document_ids.update(entry['ids'])
+        return bool(self.done)
+
+    def start(self) -> None:
+        """Start a fresh checkpoint for this source."""
+        self.clear()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._append(self.signature)
+
+    def record(self, chunk: int, document_ids: List[str]) -> None:
+        """Mark a chunk as written."""
+        self.done.add(chunk)
+        self.document_ids.update(document_ids)
+        self._append({'chunk': chunk, 'ids': document_ids})
+
+    def clear(self) -> None:
+        self.done.clear()
+        self.document_ids.clear()
+        self.path.unlink(missing_ok=True)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
@@ -1,94 +1,319 @@
+import argparse
+import hashlib
 import logging
+import time
+from typing import Dict, Optional
 import pandas as pd
-import numpy as np
 from pathlib import Path
 from langchain_chroma import Chroma
 from langchain.schema import Document
 from dotenv import load_dotenv
 
-from src.helpers.constants import bi_encoder, VECTOR_STORE_DIR, DATA_FILE, SCRIPT_DIR
-from src.helpers.document_retriever import SentenceTransformerEmbeddings
+from src.helpers.constants import BI_ENCODER_MODEL, VECTOR_STORE_DIR, NUMPY_INDEX_DIR, DATA_FILE, SCRIPT_DIR, INGEST_CHECKPOINT_FILE, EXACT_INDEX_FILE
+from src.helpers.constants import RELEVANCE_CALIBRATION_FILE
+from src.helpers.model_registry import get_bi_encoder, get_cross_encoder
+from src.helpers.batch_embedder import BatchEmbedder
+from src.helpers.embedding_cache import DiskEmbeddingCache
+from src.helpers.kb_version import bump_kb_version, new_kb_version, read_kb_version
+from src.helpers.dedup import KeptQuestions, near_duplicates
+from src.helpers.ingestion import IngestCheckpoint, iter_source_chunks
+from src.helpers.exact_match import ExactQuestionIndex
+from src.helpers.topic_classifier import train_topic_classifier
+from src.helpers.relevance_calibration import calibrate, knowledge_base_pairs
+from src.helpers.numpy_store import META_FILE, NumpyVectorIndex, index_is_current
+from src.helpers.ivf_index import IVF_META_FILE, IVFIndex
+from src.config.settings import NUMPY_INDEX_DTYPE, RETRIEVER_BACKEND, IVF_NLIST, INGEST_CHUNK_SIZE, INGEST_BATCH_SIZE, RELEVANCE_STRATEGY
+from src.config.settings import INGEST_EMBED_WORKERS, INGEST_EMBED_BATCH_SIZE, INGEST_EMBEDDING_CACHE, EMBEDDING_DISK_CACHE_DIR
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def _remove_duplicates(df: pd.DataFrame, similarity_threshold: float = 0.85) -> pd.DataFrame:
+def _remove_duplicates(
+    df: pd.DataFrame,
+    similarity_threshold: float = 0.85,
+    embedder: Optional[BatchEmbedder] = None,
+    kept: Optional[KeptQuestions] = None
+) -> pd.DataFrame:
     logger.info("Removing duplicates from dataset")
     print(f"Initial number of entries: {len(df)}")
     
     # 1. Remove exact duplicates
     df = df.drop_duplicates(subset=['Question', 'Answer'], keep='first')
     print(f"After removing exact duplicates: {len(df)}")
+    if df.empty:
+        return df
     
-    # 2. Remove similar questions
+    # 2. Remove similar questions, keeping the longer answer
+    embedder = embedder or BatchEmbedder(get_bi_encoder())
+    question_embeddings = embedder.embed(df['Question'].tolist())
+    answer_lengths = df['Answer'].astype(str).str.len().to_numpy()
     if len(df) > 1:
-        questions = df['Question'].tolist()
-        question_embeddings = bi_encoder.encode(questions)
-        similarity_matrix = np.dot(question_embeddings, question_embeddings.T)
-        
-        to_drop = set()
-        for i in range(len(df)):
-            if i in to_drop:
-                continue
-            for j in range(i + 1, len(df)):
-                if j in to_drop:
-                    continue
-                if similarity_matrix[i, j] > similarity_threshold:
-                    if len(df.iloc[i]['Answer']) < len(df.iloc[j]['Answer']):
-                        to_drop.add(i)
-                    else:
-                        to_drop.add(j)
-        
-        df = df.drop(df.index[list(to_drop)])
+        to_drop = near_duplicates(question_embeddings, answer_lengths, similarity_threshold)
+        df = df[~to_drop]
+        question_embeddings = question_embeddings[~to_drop]
+        answer_lengths = answer_lengths[~to_drop]
         print(f"After removing similar questions: {len(df)}")
     
+    # 3. Same rule against the questions kept from earlier chunks
+    if kept is not None:
+        ids = [document_id(question) for question in df['Question']]
+        df = df[~kept.add_chunk(question_embeddings, answer_lengths, ids)]
+        print(f"After removing questions kept from earlier chunks: {len(df)}")
+    
     return df
 
 
-def create_vectorstore():
+def _normalize_question(question: str) -> str:
+    return " ".join(str(question).split()).lower()
+
+def document_id(question: str) -> str:
+    """Stable document ID derived from the normalized question."""
+    return hashlib.sha256(_normalize_question(question).encode('utf-8')).hexdigest()[:32]
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def _existing_hashes(collection, page_size: int = 5000) -> Dict[str, str]:
+    """Map of document ID -> content hash currently stored in the collection."""
+    hashes = {}
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(limit=page_size, offset=offset, include=['metadatas'])
+        for doc_id, metadata in zip(page['ids'], page['metadatas']):
+            hashes[doc_id] = (metadata or {}).get('content_hash', '')
+    return hashes
+
+def _build_documents(df: pd.DataFrame) -> Dict[str, Document]:
+    """Documents of a deduplicated chunk keyed by stable ID."""
+    documents = {}
+    for question, answer in zip(df['Question'], df['Answer']):
+        doc_id = document_id(question)
+        if doc_id in documents:
+            continue
+        content = f"Question: {question}\nAnswer: {answer}"
+        documents[doc_id] = Document(
+            page_content=content,
+            metadata={'question': str(question), 'content_hash': content_hash(content)}
+        )
+    return documents
+
+def write_documents(
+    vector_store: Chroma,
+    documents: Dict[str, Document],
+    existing: Dict[str, str],
+    batch_size: int = 256
+) -> Dict[str, int]:
+    """
+    Embed and upsert the new or changed documents, in batches.
+
+    Args:
+        vector_store: Target Chroma store
+        documents: Document ID -> Document, with a 'content_hash' metadata
+        existing: Document ID -> content hash already stored
+        batch_size: Documents embedded and written per call
+
+    Returns:
+        Dict[str, int]: Counts of added, updated and unchanged documents
+    """
+    added = [doc_id for doc_id in documents if doc_id not in existing]
+    updated = [
+        doc_id for doc_id, doc in documents.items()
+        if doc_id in existing and existing[doc_id] != doc.metadata['content_hash']
+    ]
+    to_write = added + updated
+    for start in range(0, len(to_write), batch_size):
+        batch_ids = to_write[start:start + batch_size]
+        vector_store.add_documents(documents=[documents[doc_id] for doc_id in batch_ids], ids=batch_ids)
+    return {
+        'added': len(added),
+        'updated': len(updated),
+        'unchanged': len(documents) - len(added) - len(updated),
+    }
+
+def build_search_indexes(collection, backend: str = RETRIEVER_BACKEND, kb_version: Optional[str] = None) -> None:
+    """
+    Build the index files of the retriever backend if they are missing or stale.
+
+    Runs whether or not the knowledge base changed, so switching the backend
+    or deleting the index directory only takes a re-run. The Chroma backend
+    needs no extra files.
+
+    Args:
+        collection: Chroma collection (e.g. `vector_store._collection`)
+        backend: 'chroma', 'numpy' or 'ivf'
+        kb_version: Version the indexes are stamped with (defaults to the
+            current one); ingestion passes the version it is about to publish
+    """
+    if backend not in ('numpy', 'ivf'):
+        return
+    version = read_kb_version() if kb_version is None else kb_version
+    numpy_built = False
+    if not index_is_current(NUMPY_INDEX_DIR, META_FILE, version, dtype=NUMPY_INDEX_DTYPE):
+        if NumpyVectorIndex.build_from_collection(collection, NUMPY_INDEX_DIR, dtype=NUMPY_INDEX_DTYPE, kb_version=version) is None:
+            return
+        numpy_built = True
+    # The IVF lists point at rows of the NumPy index, so they follow every rebuild of it
+    if backend == 'ivf' and (numpy_built or not index_is_current(NUMPY_INDEX_DIR, IVF_META_FILE, version)):
+        IVFIndex.build_from_numpy_index(NUMPY_INDEX_DIR, nlist=IVF_NLIST or None, kb_version=version)
+
+def create_vectorstore(
+    full_rebuild: bool = False,
+    source: Path = DATA_FILE,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    batch_size: int = INGEST_BATCH_SIZE,
+    resume: bool = True,
+    workers: int = INGEST_EMBED_WORKERS,
+    embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+    use_embedding_cache: bool = INGEST_EMBEDDING_CACHE
+):
+    """
+    Create or incrementally update the oncology Q&A vector store.
+
+    The source is read in chunks of `chunk_size` rows; each chunk is
+    deduplicated within itself and against the questions kept from earlier
+    chunks, and its new or changed rows are embedded and written in batches
+    of `batch_size` before the next chunk is read. A later row with a longer
+    answer replaces the earlier duplicate it matches. Finished chunks are
+    checkpointed, so an interrupted run resumes where it stopped; their
+    deduplication is replayed (from the embedding cache) without rewriting
+    them. Rows that are no longer in the source, or were replaced, are
+    removed at the end.
+
+    Args:
+        full_rebuild: Drop the collection and re-embed every row
+        source: Excel, CSV, Parquet or JSONL file with Question/Answer columns
+        chunk_size: Rows read per chunk
+        batch_size: Documents embedded and written per call
+        resume: Continue from the checkpoint of an interrupted run
+        workers: Embedding processes (0 or 1 embeds in this process)
+        embed_batch_size: Texts per model forward pass
+        use_embedding_cache: Reuse embeddings of texts already embedded by an earlier run
+    """
     load_dotenv()
-    embeddings = SentenceTransformerEmbeddings(bi_encoder)
+    source = Path(source)
+    if not source.exists():
+        logger.error(f"Data file not found at: {source}")
+        return None
     
-    try:
-        import chromadb
-        client = chromadb.PersistentClient(path=str(VECTOR_STORE_DIR))
-        client.delete_collection("oncology_qa")
-        logger.info("Deleted existing collection")
-    except Exception as e:
-        logger.info(f"No existing collection to delete: {e}")
+    cache = DiskEmbeddingCache(EMBEDDING_DISK_CACHE_DIR, BI_ENCODER_MODEL) if use_embedding_cache else None
+    embedder = BatchEmbedder(get_bi_encoder(), workers=workers, batch_size=embed_batch_size, cache=cache)
+    checkpoint = IngestCheckpoint(INGEST_CHECKPOINT_FILE, source, chunk_size)
+    
+    if full_rebuild:
+        checkpoint.clear()
+        try:
+            import chromadb
+            client = chromadb.PersistentClient(path=str(VECTOR_STORE_DIR))
+            client.delete_collection("oncology_qa")
+            logger.info("Deleted existing collection")
+        except Exception as e:
+            logger.info(f"No existing collection to delete: {e}")
     
     vector_store = Chroma(
         collection_name="oncology_qa",
-        embedding_function=embeddings,
+        embedding_function=embedder,
         persist_directory=str(VECTOR_STORE_DIR)
     )
+    existing = _existing_hashes(vector_store._collection)
+    
+    if resume and checkpoint.load():
+        logger.info(f"Resuming ingestion after {len(checkpoint.done)} finished chunks")
+    else:
+        checkpoint.start()
     
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    kept = KeptQuestions()
+    rows_read = 0
+    started = time.perf_counter()
     try:
-        if not DATA_FILE.exists():
-            logger.error(f"Data file not found at: {DATA_FILE}")
-            return None
+        for chunk_index, chunk in enumerate(iter_source_chunks(source, chunk_size)):
+            rows_read += len(chunk)
+            chunk = _remove_duplicates(chunk, embedder=embedder, kept=kept)
+            if chunk_index in checkpoint.done:
+                continue
+            
+            documents = _build_documents(chunk)
+            for name, value in write_documents(vector_store, documents, existing, batch_size).items():
+                counts[name] += value
+            checkpoint.record(chunk_index, list(documents))
             
-        oncology_data = pd.read_excel(DATA_FILE)
-        logger.info(f"Loaded {len(oncology_data)} rows from Excel")
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Chunk {chunk_index + 1}: {rows_read} rows read, {len(kept)} documents kept, "
+                f"{counts['added'] + counts['updated']} written ({rows_read / elapsed:.0f} rows/s)"
+            )
     except Exception as e:
-        logger.error(f"Error loading Excel file: {e}")
+        logger.error(f"Error ingesting {source}: {e}")
         return None
+    finally:
+        embedder.close()
+        throughput = embedder.stats()
+        logger.info(
+            f"Embedded {throughput['sentences']} texts in {throughput['seconds']:.1f}s "
+            f"({throughput['sentences_per_second']} sentences/s, {throughput['workers']} worker(s))"
+        )
+        if cache is not None:
+            cache_stats = cache.stats()
+            logger.info(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
     
-    oncology_data = _remove_duplicates(oncology_data)
-    
-    documents = []
-    for _, row in oncology_data.iterrows():
-        content = f"Question: {row['Question']}\nAnswer: {row['Answer']}"
-        documents.append(Document(page_content=content))
+    # Rows gone from the source, and earlier duplicates replaced by a longer answer
+    kept_ids = kept.kept_ids()
+    removed = sorted((set(existing) | checkpoint.document_ids) - kept_ids)
+    for start in range(0, len(removed), batch_size):
+        vector_store.delete(ids=removed[start:start + batch_size])
+    counts['removed'] = len(removed)
+    logger.info(
+        f"Knowledge base sync: {counts['added']} added, {counts['updated']} updated, "
+        f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+    )
     
-    vector_store.add_documents(documents=documents)
-    logger.info(f"Vector store created with {len(documents)} documents.")
+    kb_changed = full_rebuild or counts['added'] or counts['updated'] or counts['removed'] or not EXACT_INDEX_FILE.exists()
+    # Questions were embedded for dedup already, so this mostly reads the disk cache
+    question_embedder = BatchEmbedder(get_bi_encoder(), batch_size=embed_batch_size, cache=cache)
+    if kb_changed:
+        ExactQuestionIndex.build_from_collection(vector_store._collection, EXACT_INDEX_FILE)
+        questions = [entry['question'] for entry in ExactQuestionIndex.load(EXACT_INDEX_FILE).entries.values()]
+        if questions:
+            train_topic_classifier(questions, question_embedder.embed)
+    # The local relevance strategies read calibrated cross-encoder probabilities
+    if RELEVANCE_STRATEGY != 'llm' and (kb_changed or not RELEVANCE_CALIBRATION_FILE.exists()):
+        pairs = knowledge_base_pairs(ExactQuestionIndex.load(EXACT_INDEX_FILE).entries.values(), question_embedder.embed)
+        if pairs:
+            calibrate(pairs, get_cross_encoder(), RELEVANCE_CALIBRATION_FILE, source="knowledge_base")
+    # The search indexes are stamped with the new version before it is
+    # published, so servers reloading on the change find them current
+    version = new_kb_version() if kb_changed else read_kb_version()
+    build_search_indexes(vector_store._collection, RETRIEVER_BACKEND, kb_version=version)
+    if kb_changed:
+        bump_kb_version(version)
+    checkpoint.clear()
+    logger.info(f"Vector store ready with {len(kept_ids)} documents.")
     return vector_store
 
 def main():
+    parser = argparse.ArgumentParser(description="Create or update the oncology Q&A vector store")
+    parser.add_argument("--full-rebuild", action="store_true", help="Drop the collection and re-embed every row")
+    parser.add_argument("--source", type=Path, default=DATA_FILE, help="Excel, CSV, Parquet or JSONL source file")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Rows read per chunk")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Documents embedded per batch")
+    parser.add_argument("--workers", type=int, default=INGEST_EMBED_WORKERS, help="Embedding processes")
+    parser.add_argument("--embed-batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE, help="Texts per model forward pass")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Re-encode every text")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint of an interrupted run")
+    args = parser.parse_args()
+    
     logger.info("Initializing vector store...")
-    vector_store = create_vectorstore()
+    vector_store = create_vectorstore(
+        full_rebuild=args.full_rebuild,
+        source=args.source,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        resume=not args.no_resume,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        use_embedding_cache=INGEST_EMBEDDING_CACHE and not args.no_embedding_cache
+    )
     if vector_store:
         logger.info("Vector store initialized successfully")
         return vector_store
@@ -0,0 +1,244 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index on top of the NumPy backend."""
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from .constants import NUMPY_INDEX_DIR
+from .embedding_cache import query_embedding_cache
+from .kb_version import VersionedResource
+from .model_registry import get_bi_encoder
+from .numpy_store import EMBEDDINGS_FILE, META_FILE, DocumentStore, NumpyVectorIndex, _normalize_rows, require_current_index, top_k
+from src.config.settings import IVF_NPROBE
+
+logger = logging.getLogger(__name__)
+
+CENTROIDS_FILE = 'ivf_centroids.npy'
+OFFSETS_FILE = 'ivf_offsets.npy'
+IDS_FILE = 'ivf_ids.npy'
+VECTORS_FILE = 'ivf_vectors.npy'
+IVF_META_FILE = 'ivf_meta.json'
+
+def default_nlist(count: int) -> int:
+    """Number of lists used when none is given: about 4 * sqrt(n)."""
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int) -> np.ndarray:
+    """Index of the closest centroid (by cosine) of every row."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+def train_centroids(
+    sample: np.ndarray,
+    nlist: int,
+    iterations: int = 20,
+    seed: int = 0,
+    chunk_size: int = 65536
+) -> np.ndarray:
+    """
+    Spherical k-means over normalized vectors.
+
+    Args:
+        sample: Normalized float32 training vectors
+        nlist: Number of centroids
+        iterations: Lloyd iterations
+        seed: Random seed for initialisation and reseeding of empty lists
+        chunk_size: Rows scored against the centroids at once
+
+    Returns:
+        np.ndarray: Normalized (nlist, dim) centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids, chunk_size)
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        non_empty = counts > 0
+        sums = np.add.reduceat(sample[order], starts[non_empty], axis=0)
+        centroids[non_empty] = sums
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            # Restart empty lists from random points so every list is used
+            centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        centroids = _normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+class IVFIndex:
+    """
+    Approximate search backend for large knowledge bases.
+
+    Documents are clustered into `nlist` lists by spherical k-means and
+    stored list by list. A query is compared with the centroids and then
+    only with the vectors of its `nprobe` closest lists, so a larger
+    `nprobe` trades speed for recall. Documents and their row order are
+    shared with the NumPy exact index built from the same collection.
+    """
+
+    def __init__(self, index_dir: Path = NUMPY_INDEX_DIR, nprobe: int = 8, base: Optional[NumpyVectorIndex] = None):
+        self.index_dir = Path(index_dir)
+        self.nprobe = nprobe
+        self.centroids = np.load(self.index_dir / CENTROIDS_FILE)
+        self.offsets = np.load(self.index_dir / OFFSETS_FILE)
+        self.ids = np.load(self.index_dir / IDS_FILE, mmap_mode='r')
+        self.vectors = np.load(self.index_dir / VECTORS_FILE, mmap_mode='r')
+        self.documents: Optional[DocumentStore] = None
+        if base is not None:
+            self.documents = base.documents
+            if len(self.documents) != len(self.ids):
+                raise ValueError(
+                    f"IVF index at {self.index_dir} is out of date: "
+                    f"{len(self.ids)} vectors for {len(self.documents)} documents"
+                )
+        logger.info(f"Loaded IVF index with {len(self.ids)} vectors in {len(self.centroids)} lists (nprobe={nprobe})")
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def search_ids(self, query_embedding: np.ndarray, k: int = 5, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the row ids and cosine similarities of the approximate top k.
+
+        Args:
+            query_embedding: Query vector
+            k: Number of results
+            nprobe: Lists to scan (defaults to the index setting)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        probes = top_k(self.centroids @ query, nprobe or self.nprobe)
+
+        ids, scores = [], []
+        for list_id in probes:
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            vectors = np.asarray(self.vectors[start:end], dtype=np.float32)
+            scores.append(vectors @ query)
+            ids.append(self.ids[start:end])
+        if not scores:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.concatenate(scores)
+        ids = np.concatenate(ids)
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """Return the approximate k most similar documents with their cosine similarity."""
+        if self.documents is None:
+            raise RuntimeError("IVF index was loaded without documents")
+        ids, scores = self.search_ids(query_embedding, k, nprobe)
+        return [(self.documents[i], float(score)) for i, score in zip(ids, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """Return the approximate k most similar documents to a query with their cosine similarity."""
+        embedding = query_embedding_cache.encode(get_bi_encoder(), query)
+        return self.search_by_vector(embedding, k)
+
+    def similarity_search(self, query: str, k: int = 5) -> List[Document]:
+        """Same contract as Chroma.similarity_search."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        index_dir: Path = NUMPY_INDEX_DIR,
+        nlist: Optional[int] = None,
+        iterations: int = 20,
+        sample_size: int = 100000,
+        chunk_size: int = 65536,
+        seed: int = 0,
+        kb_version: str = ""
+    ) -> Path:
+        """
+        Cluster normalized embeddings and write the IVF files.
+
+        Centroids are trained on a random sample; every vector is then
+        assigned in chunks and copied, list by list, into a memory-mapped
+        matrix, so memory stays bounded for millions of rows.
+
+        Args:
+            embeddings: Normalized (n, dim) matrix, typically memory-mapped
+            index_dir: Directory of the index files
+            nlist: Number of lists (defaults to about 4 * sqrt(n))
+            iterations: k-means iterations
+            sample_size: Vectors used to train the centroids
+            chunk_size: Rows processed at once
+            seed: Random seed
+            kb_version: Knowledge-base version recorded in the metadata
+
+        Returns:
+            Path of the index directory
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        count = len(embeddings)
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        sample = np.asarray(embeddings[sample_ids], dtype=np.float32)
+        nlist = min(nlist or default_nlist(count), len(sample))
+        centroids = train_centroids(sample, nlist, iterations, seed, chunk_size)
+
+        labels = _assign(embeddings, centroids, chunk_size)
+        ids = np.argsort(labels, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=nlist)))).astype(np.int64)
+
+        tmp_vectors = index_dir / (VECTORS_FILE + '.tmp')
+        vectors = np.lib.format.open_memmap(tmp_vectors, mode='w+', dtype=embeddings.dtype, shape=embeddings.shape)
+        for start in range(0, count, chunk_size):
+            rows = ids[start:start + chunk_size]
+            # Read the rows in file order, then place them in list order
+            read_order = np.argsort(rows)
+            chunk = np.empty((len(rows), embeddings.shape[1]), dtype=embeddings.dtype)
+            chunk[read_order] = embeddings[rows[read_order]]
+            vectors[start:start + len(rows)] = chunk
+        vectors.flush()
+        del vectors
+
+        # Written to temporary names first so a running reader never sees a mix
+        for name, array in ((CENTROIDS_FILE, centroids), (OFFSETS_FILE, offsets), (IDS_FILE, ids)):
+            with open(index_dir / (name + '.tmp'), 'wb') as file:
+                np.save(file, array)
+        for name in (CENTROIDS_FILE, OFFSETS_FILE, IDS_FILE, VECTORS_FILE):
+            os.replace(index_dir / (name + '.tmp'), index_dir / name)
+        with open(index_dir / IVF_META_FILE, 'w', encoding='utf-8') as meta_file:
+            json.dump({'count': count, 'nlist': nlist, 'iterations': iterations, 'kb_version': kb_version}, meta_file)
+
+        sizes = np.diff(offsets)
+        logger.info(f"IVF index built with {count} vectors in {nlist} lists (largest list {sizes.max()})")
+        return index_dir
+
+    @classmethod
+    def build_from_numpy_index(cls, index_dir: Path = NUMPY_INDEX_DIR, **kwargs) -> Path:
+        """Build the IVF files from the exact index already exported to `index_dir`."""
+        embeddings = np.load(Path(index_dir) / EMBEDDINGS_FILE, mmap_mode='r')
+        return cls.build(embeddings, index_dir, **kwargs)
+
+def _load_ivf_index() -> IVFIndex:
+    require_current_index(NUMPY_INDEX_DIR, META_FILE, "NumPy index")
+    require_current_index(NUMPY_INDEX_DIR, IVF_META_FILE, "IVF index")
+    return IVFIndex(NUMPY_INDEX_DIR, nprobe=IVF_NPROBE, base=NumpyVectorIndex(NUMPY_INDEX_DIR))
+
+# Shared index, reloaded when the knowledge base is rebuilt
+_ivf_index = VersionedResource(_load_ivf_index, name="IVF index")
+
+def get_ivf_index() -> IVFIndex:
+    """
+    Return the shared IVF index, loading it on first use.
+
+    Raises:
+        IndexUnavailableError: If the index is missing or stale
+    """
+    return _ivf_index.get()
@@ -0,0 +1,91 @@
+"""Version marker of the knowledge base, changed every time it is rebuilt."""
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+from .constants import VECTOR_STORE_DIR
+
+KB_VERSION_FILE = VECTOR_STORE_DIR / 'kb_version'
+
+logger = logging.getLogger(__name__)
+
+def read_kb_version() -> str:
+    """Return the current knowledge base version, or an empty string if never built."""
+    try:
+        return KB_VERSION_FILE.read_text().strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return ""
+
+def new_kb_version() -> str:
+    """Return a fresh version marker without publishing it."""
+    return uuid.uuid4().hex
+
+def bump_kb_version(version: Optional[str] = None) -> str:
+    """
+    Record that the knowledge base changed so caches built on it are dropped.
+
+    Args:
+        version: Version to publish (a fresh one by default); files stamped
+            with it beforehand are current as soon as it is published
+
+    Returns:
+        str: The published version
+    """
+    version = version or new_kb_version()
+    KB_VERSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = KB_VERSION_FILE.with_name(KB_VERSION_FILE.name + '.tmp')
+    tmp_path.write_text(version)
+    os.replace(tmp_path, KB_VERSION_FILE)
+    return version
+
+class VersionedResource:
+    """
+    Lazily built resource derived from the knowledge base.
+
+    The resource is built on first use and rebuilt when the knowledge base
+    version changes; the version file is checked at most every
+    `check_interval` seconds. If a rebuild fails, the previous resource keeps
+    being served and the rebuild is retried at the next check.
+    """
+
+    def __init__(self, loader: Callable[[], Any], name: str, check_interval: float = 5.0):
+        self.loader = loader
+        self.name = name
+        self.check_interval = check_interval
+        self._resource: Any = None
+        self._loaded = False
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return self._resource
+
+        with self._lock:
+            self._checked_at = now
+            version = read_kb_version()
+            if not self._loaded or version != self._version:
+                if self._loaded:
+                    logger.info(f"Knowledge base changed, reloading {self.name}")
+                    try:
+                        resource = self.loader()
+                    except Exception as e:
+                        logger.error(f"Could not reload {self.name}, serving the previous one: {str(e)}")
+                        return self._resource
+                else:
+                    resource = self.loader()
+                self._resource = resource
+                self._loaded = True
+                self._version = version
+            return self._resource
+
+    def reset(self) -> None:
+        """Drop the resource so the next call rebuilds it."""
+        with self._lock:
+            self._resource = None
+            self._loaded = False
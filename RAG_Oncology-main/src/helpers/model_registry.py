@@ -0,0 +1,107 @@
+"""Central registry that loads each embedding model once per process, on first use."""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .constants import BI_ENCODER_MODEL, CROSS_ENCODER_MODEL
+
+logger = logging.getLogger(__name__)
+
+def _load_sentence_transformer(model_name: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _load_cross_encoder(model_name: str) -> Any:
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
+
+def _memory_footprint(model: Any) -> Optional[int]:
+    """Bytes taken by the parameters and buffers of a torch-backed model."""
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return None
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+class ModelRegistry:
+    """
+    Lazily loads registered models and shares one instance of each.
+
+    Loading is guarded per model, so concurrent first calls wait for a single
+    load instead of loading duplicates.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], model_name: Optional[str] = None) -> None:
+        """Register how to load a model under a logical name."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._info.setdefault(name, {"model_name": model_name, "loaded": False})
+
+    def get(self, name: str) -> Any:
+        """Return the model registered under `name`, loading it on first use."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            start = time.perf_counter()
+            model = self._loaders[name]()
+            load_seconds = time.perf_counter() - start
+            self._models[name] = model
+            self._info[name].update(
+                loaded=True,
+                load_seconds=round(load_seconds, 3),
+                memory_bytes=_memory_footprint(model),
+            )
+            logger.info(f"Loaded model '{name}' in {load_seconds:.2f}s")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Load models ahead of the first request.
+
+        Args:
+            names: Models to load (defaults to every registered model)
+
+        Returns:
+            Stats of the loaded models
+        """
+        for name in (list(names) if names is not None else list(self._loaders)):
+            self.get(name)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return load time and memory footprint of every registered model."""
+        with self._lock:
+            return {name: dict(info) for name, info in self._info.items()}
+
+model_registry = ModelRegistry()
+model_registry.register('bi_encoder', lambda: _load_sentence_transformer(BI_ENCODER_MODEL), BI_ENCODER_MODEL)
+model_registry.register('cross_encoder', lambda: _load_cross_encoder(CROSS_ENCODER_MODEL), CROSS_ENCODER_MODEL)
+
+def get_bi_encoder() -> Any:
+    """Shared SentenceTransformer used for all embeddings."""
+    return model_registry.get('bi_encoder')
+
+def get_cross_encoder() -> Any:
+    """Shared cross-encoder used for re-ranking."""
+    return model_registry.get('cross_encoder')
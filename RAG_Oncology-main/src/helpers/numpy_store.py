@@ -0,0 +1,268 @@
+"""Exact nearest-neighbour search over a memory-mapped NumPy embedding matrix."""
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from .constants import NUMPY_INDEX_DIR
+from .embedding_cache import query_embedding_cache
+from .kb_version import VersionedResource, read_kb_version
+from .model_registry import get_bi_encoder
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+DOCUMENTS_FILE = 'documents.jsonl'
+DOCUMENT_OFFSETS_FILE = 'document_offsets.npy'
+META_FILE = 'meta.json'
+
+class IndexUnavailableError(RuntimeError):
+    """The configured retriever index is missing or was built for another knowledge-base version."""
+
+def read_index_meta(index_dir: Path, meta_file: str = META_FILE) -> Optional[Dict[str, Any]]:
+    """Metadata written next to an index, or None if the index was never built."""
+    try:
+        with open(Path(index_dir) / meta_file, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def index_is_current(index_dir: Path, meta_file: str = META_FILE, kb_version: Optional[str] = None, **expected: Any) -> bool:
+    """
+    Whether an index exists and was built for the knowledge-base version.
+
+    Args:
+        index_dir: Directory of the index files
+        meta_file: Metadata file of the index
+        kb_version: Expected version (defaults to the current one)
+        expected: Other metadata values that must match, e.g. dtype
+
+    Returns:
+        bool
+    """
+    meta = read_index_meta(index_dir, meta_file)
+    if meta is None:
+        return False
+    kb_version = read_kb_version() if kb_version is None else kb_version
+    return meta.get('kb_version') == kb_version and all(meta.get(key) == value for key, value in expected.items())
+
+def require_current_index(index_dir: Path, meta_file: str, name: str) -> None:
+    """
+    Raise if the index cannot serve the current knowledge base.
+
+    Raises:
+        IndexUnavailableError: If the index is missing or stale
+    """
+    if read_index_meta(index_dir, meta_file) is None:
+        raise IndexUnavailableError(
+            f"No {name} at {index_dir}; run `python -m src.helpers.init_vectorstore` "
+            f"with the same RETRIEVER_BACKEND to build it"
+        )
+    if not index_is_current(index_dir, meta_file):
+        raise IndexUnavailableError(
+            f"The {name} at {index_dir} was built for another knowledge-base version; "
+            f"run `python -m src.helpers.init_vectorstore` to rebuild it"
+        )
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without a full sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def _line_offsets(data: Any, chunk_size: int = 1 << 24) -> np.ndarray:
+    """Byte offset of every line start plus the end of the data, scanning it a chunk at a time."""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    for start in range(0, len(data), chunk_size):
+        chunk = np.frombuffer(data[start:start + chunk_size], dtype=np.uint8)
+        offsets.append(np.flatnonzero(chunk == ord('\n')).astype(np.int64) + start + 1)
+    return np.concatenate(offsets)
+
+class DocumentStore:
+    """
+    Documents of an index, parsed from `documents.jsonl` only when requested.
+
+    The JSONL file is memory-mapped and `document_offsets.npy` holds the
+    byte offset of every line, so resident memory does not grow with the
+    knowledge base; search results build `Document`s for their hits only.
+    Indexes built before the offsets file existed get their offsets from a
+    scan of the file at load.
+    """
+
+    def __init__(self, index_dir: Path):
+        path = Path(index_dir) / DOCUMENTS_FILE
+        size = path.stat().st_size
+        with open(path, 'rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        offsets_path = Path(index_dir) / DOCUMENT_OFFSETS_FILE
+        self.offsets = np.load(offsets_path, mmap_mode='r') if offsets_path.exists() else _line_offsets(self._data)
+        if self.offsets[-1] != size:
+            raise ValueError(f"Document offsets of {index_dir} do not match {DOCUMENTS_FILE}")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> Document:
+        record = json.loads(self._data[int(self.offsets[row]):int(self.offsets[row + 1])])
+        return Document(page_content=record['content'], metadata=record.get('metadata') or {}, id=record['id'])
+
+class NumpyVectorIndex:
+    """
+    In-memory exact search backend.
+
+    Holds the normalized bi-encoder embeddings of every document as a
+    memory-mapped float32 or float16 `.npy` matrix plus the documents
+    themselves in a memory-mapped JSONL file. A query costs one
+    matrix-vector product and an `argpartition`.
+    """
+
+    def __init__(self, index_dir: Path = NUMPY_INDEX_DIR, chunk_size: int = 65536):
+        self.index_dir = Path(index_dir)
+        self.chunk_size = chunk_size
+        self.embeddings = np.load(self.index_dir / EMBEDDINGS_FILE, mmap_mode='r')
+
+        self.documents = DocumentStore(self.index_dir)
+
+        if len(self.documents) != self.embeddings.shape[0]:
+            raise ValueError(
+                f"NumPy index at {self.index_dir} is inconsistent: "
+                f"{self.embeddings.shape[0]} embeddings for {len(self.documents)} documents"
+            )
+        logger.info(f"Loaded NumPy index with {len(self.documents)} documents ({self.embeddings.dtype})")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query with every document."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        if self.embeddings.dtype == np.float32:
+            return np.asarray(self.embeddings @ query)
+
+        # float16 has no BLAS path; upcast one chunk at a time to keep memory bounded
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.chunk_size):
+            chunk = np.asarray(self.embeddings[start:start + self.chunk_size], dtype=np.float32)
+            scores[start:start + len(chunk)] = chunk @ query
+        return scores
+
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Document, float]]:
+        """Return the k most similar documents with their cosine similarity."""
+        scores = self.scores(query_embedding)
+        return [(self.documents[i], float(scores[i])) for i in top_k(scores, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """Return the k most similar documents to a query with their cosine similarity."""
+        embedding = query_embedding_cache.encode(get_bi_encoder(), query)
+        return self.search_by_vector(embedding, k)
+
+    def similarity_search(self, query: str, k: int = 5) -> List[Document]:
+        """Same contract as Chroma.similarity_search."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    @classmethod
+    def build_from_collection(
+        cls,
+        collection: Any,
+        index_dir: Path = NUMPY_INDEX_DIR,
+        dtype: str = 'float32',
+        page_size: int = 5000,
+        kb_version: str = ""
+    ) -> Optional[Path]:
+        """
+        Export a Chroma collection to NumPy index files.
+
+        Embeddings already computed by Chroma are reused, a page at a time,
+        so the export never holds the whole collection in memory. Files are
+        written next to the live ones and swapped in at the end.
+
+        Args:
+            collection: Chroma collection (e.g. `vector_store._collection`)
+            index_dir: Directory of the index files
+            dtype: 'float32' or 'float16'
+            page_size: Documents fetched from Chroma per call
+            kb_version: Knowledge-base version recorded in the metadata
+
+        Returns:
+            Path of the index directory, or None if the collection is empty
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        total = collection.count()
+        if total == 0:
+            logger.warning("Collection is empty, NumPy index not built")
+            return None
+
+        tmp_embeddings = index_dir / (EMBEDDINGS_FILE + '.tmp')
+        tmp_documents = index_dir / (DOCUMENTS_FILE + '.tmp')
+        tmp_offsets = index_dir / (DOCUMENT_OFFSETS_FILE + '.tmp')
+        matrix = None
+        written = 0
+        offsets = np.zeros(total + 1, dtype=np.int64)
+        with open(tmp_documents, 'wb') as documents_file:
+            for offset in range(0, total, page_size):
+                page = collection.get(
+                    limit=page_size,
+                    offset=offset,
+                    include=['embeddings', 'documents', 'metadatas']
+                )
+                vectors = _normalize_rows(np.asarray(page['embeddings'], dtype=np.float32))
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        tmp_embeddings, mode='w+', dtype=np.dtype(dtype), shape=(total, vectors.shape[1])
+                    )
+                matrix[written:written + len(vectors)] = vectors
+                for row, (doc_id, content, metadata) in enumerate(zip(page['ids'], page['documents'], page['metadatas']), written):
+                    line = json.dumps(
+                        {'id': doc_id, 'content': content, 'metadata': metadata or {}},
+                        ensure_ascii=False
+                    ).encode('utf-8') + b'\n'
+                    documents_file.write(line)
+                    offsets[row + 1] = offsets[row] + len(line)
+                written += len(vectors)
+
+        matrix.flush()
+        del matrix
+        if written != total:
+            raise ValueError(f"Collection changed during export: expected {total} documents, got {written}")
+        with open(tmp_offsets, 'wb') as offsets_file:
+            np.save(offsets_file, offsets)
+        os.replace(tmp_embeddings, index_dir / EMBEDDINGS_FILE)
+        os.replace(tmp_documents, index_dir / DOCUMENTS_FILE)
+        os.replace(tmp_offsets, index_dir / DOCUMENT_OFFSETS_FILE)
+        with open(index_dir / META_FILE, 'w', encoding='utf-8') as meta_file:
+            json.dump({'count': written, 'dtype': dtype, 'kb_version': kb_version}, meta_file)
+        logger.info(f"NumPy index built with {written} documents at {index_dir}")
+        return index_dir
+
+def _load_numpy_index() -> NumpyVectorIndex:
+    require_current_index(NUMPY_INDEX_DIR, META_FILE, "NumPy index")
+    return NumpyVectorIndex(NUMPY_INDEX_DIR)
+
+# Shared index, reloaded when the knowledge base is rebuilt
+_numpy_index = VersionedResource(_load_numpy_index, name="NumPy index")
+
+def get_numpy_index() -> NumpyVectorIndex:
+    """
+    Return the shared NumPy index, loading it on first use.
+
+    Raises:
+        IndexUnavailableError: If the index is missing or stale
+    """
+    return _numpy_index.get()
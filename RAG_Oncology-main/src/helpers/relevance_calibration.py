@@ -0,0 +1,235 @@
+"""Calibration of cross-encoder relevance scores into probabilities (Platt scaling)."""
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import RELEVANCE_CALIBRATION_FILE
+
+logger = logging.getLogger(__name__)
+
+# (query, document text, relevant)
+LabelledPair = Tuple[str, str, bool]
+
+def document_text(question: str, answer: str) -> str:
+    """Document text in the form stored in the knowledge base."""
+    return f"Question: {question}\nAnswer: {answer}"
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+def fit_platt(logits: np.ndarray, labels: np.ndarray, iterations: int = 100) -> Tuple[float, float]:
+    """
+    Fit p = sigmoid(a * logit + b) to binary labels with Newton's method.
+
+    Targets are smoothed as in Platt (1999), so separable data still gives
+    finite parameters.
+
+    Args:
+        logits: Raw cross-encoder scores
+        labels: 1 for relevant pairs, 0 otherwise
+        iterations: Maximum Newton steps
+
+    Returns:
+        (a, b)
+    """
+    logits = np.asarray(logits, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    positives, negatives = int(labels.sum()), int((~labels).sum())
+    if not positives or not negatives:
+        raise ValueError("Calibration needs both relevant and irrelevant pairs")
+    targets = np.where(labels, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+    def loss(a: float, b: float) -> float:
+        z = a * logits + b
+        # Cross-entropy against the smoothed targets, written to stay finite for large |z|
+        return float(np.sum(np.logaddexp(0.0, z) - targets * z))
+
+    a, b = 1.0, 0.0
+    current = loss(a, b)
+    for _ in range(iterations):
+        p = _sigmoid(a * logits + b)
+        weights = p * (1 - p) + 1e-12
+        residuals = p - targets
+        gradient = np.array([residuals @ logits, residuals.sum()])
+        hessian = np.array([
+            [weights @ (logits * logits), weights @ logits],
+            [weights @ logits, weights.sum()],
+        ]) + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        # Backtracking line search (Lin, Lin and Weng, 2007): a full Newton
+        # step can overshoot when the start is far from the optimum
+        scale = 1.0
+        while scale >= 1e-10:
+            candidate = loss(a - scale * step[0], b - scale * step[1])
+            if candidate < current + 1e-4 * scale * (gradient @ -step):
+                break
+            scale /= 2
+        else:
+            break
+        a, b, current = a - scale * step[0], b - scale * step[1], candidate
+        if np.abs(scale * step).max() < 1e-9:
+            break
+    return float(a), float(b)
+
+class RelevanceCalibration:
+    """Maps raw cross-encoder logits to calibrated relevance probabilities."""
+
+    def __init__(self, a: float, b: float, info: Optional[Dict[str, Any]] = None):
+        self.a = a
+        self.b = b
+        self.info = info or {}
+
+    def probabilities(self, logits: Sequence[float]) -> np.ndarray:
+        return _sigmoid(self.a * np.asarray(logits, dtype=np.float64) + self.b)
+
+    def save(self, path: Path = RELEVANCE_CALIBRATION_FILE) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'a': self.a, 'b': self.b, **self.info}, file, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = RELEVANCE_CALIBRATION_FILE) -> Optional["RelevanceCalibration"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        a, b = data.pop('a'), data.pop('b')
+        return cls(a, b, data)
+
+def calibrate(
+    pairs: Sequence[LabelledPair],
+    cross_encoder: Any,
+    path: Path = RELEVANCE_CALIBRATION_FILE,
+    source: str = "labelled",
+    batch_size: int = 32
+) -> RelevanceCalibration:
+    """
+    Score labelled pairs with the cross-encoder, fit the calibration and save it.
+
+    Args:
+        pairs: (query, document text, relevant) triples
+        cross_encoder: Cross-encoder used at query time
+        path: Where to save the calibration
+        source: Where the pairs came from, recorded with the parameters
+        batch_size: Pairs per predict batch
+
+    Returns:
+        RelevanceCalibration
+    """
+    logits = np.asarray(
+        cross_encoder.predict([(query, text) for query, text, _ in pairs], batch_size=batch_size, show_progress_bar=False),
+        dtype=np.float64
+    )
+    labels = np.array([relevant for _, _, relevant in pairs], dtype=bool)
+    a, b = fit_platt(logits, labels)
+    calibration = RelevanceCalibration(a, b)
+    accuracy = float(((calibration.probabilities(logits) >= 0.5) == labels).mean())
+    calibration.info = {'pairs': len(pairs), 'positives': int(labels.sum()), 'source': source, 'accuracy_at_0.5': round(accuracy, 4)}
+    calibration.save(path)
+    logger.info(f"Relevance calibration a={a:.3f} b={b:.3f} fitted on {len(pairs)} {source} pairs (accuracy {accuracy:.3f})")
+    return calibration
+
+def knowledge_base_pairs(
+    entries: Sequence[Dict[str, str]],
+    embed: Callable[[List[str]], np.ndarray],
+    sample_size: int = 300,
+    seed: int = 0
+) -> List[LabelledPair]:
+    """
+    Labelled pairs built from the knowledge base itself.
+
+    Each sampled question is paired with its own document (relevant), with
+    the document of its most similar other question (a hard irrelevant
+    pair) and with a random document (an easy irrelevant pair). Labelled
+    user queries give a better calibration when they are available.
+
+    Args:
+        entries: Knowledge-base entries with 'question' and 'answer'
+        embed: Embeds a list of texts, returning a (n, dim) array
+        sample_size: Questions sampled
+        seed: Random seed
+
+    Returns:
+        List of (query, document text, relevant)
+    """
+    rng = np.random.default_rng(seed)
+    entries = list(entries)
+    if len(entries) < 3:
+        return []
+    sample = [entries[i] for i in rng.choice(len(entries), size=min(sample_size, len(entries)), replace=False)]
+    questions = [entry['question'] for entry in sample]
+    embeddings = np.asarray(embed(questions), dtype=np.float32)
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarities = embeddings @ embeddings.T
+    np.fill_diagonal(similarities, -np.inf)
+    nearest = similarities.argmax(axis=1)
+
+    pairs: List[LabelledPair] = []
+    for i, entry in enumerate(sample):
+        pairs.append((entry['question'], document_text(entry['question'], entry['answer']), True))
+        neighbour = sample[nearest[i]]
+        pairs.append((entry['question'], document_text(neighbour['question'], neighbour['answer']), False))
+        other = sample[(i + 1 + rng.integers(len(sample) - 1)) % len(sample)]
+        pairs.append((entry['question'], document_text(other['question'], other['answer']), False))
+    return pairs
+
+def read_labelled_pairs(path: Path) -> List[LabelledPair]:
+    """Read (query, question, answer, relevant) rows from a CSV file."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    missing = [column for column in ('query', 'question', 'answer', 'relevant') if column not in df.columns]
+    if missing:
+        raise ValueError(f"Labelled pairs file {path} is missing columns: {', '.join(missing)}")
+    relevant = df['relevant'].astype(str).str.strip().str.lower().isin(('1', 'true', 'yes'))
+    return [
+        (str(query), document_text(question, answer), bool(label))
+        for query, question, answer, label in zip(df['query'], df['question'], df['answer'], relevant)
+    ]
+
+_calibration_lock = threading.Lock()
+# mtime -1: nothing loaded yet
+_calibration_cache: Dict[str, Any] = {'mtime_ns': -1, 'value': None}
+
+def get_relevance_calibration(path: Path = RELEVANCE_CALIBRATION_FILE) -> Optional[RelevanceCalibration]:
+    """Return the saved calibration, reloading it when the file changes; None if there is none."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = None
+    with _calibration_lock:
+        if mtime_ns != _calibration_cache['mtime_ns']:
+            _calibration_cache['value'] = RelevanceCalibration.load(path) if mtime_ns is not None else None
+            _calibration_cache['mtime_ns'] = mtime_ns
+            if mtime_ns is None:
+                logger.warning(f"No relevance calibration at {path}, using the uncalibrated cross-encoder sigmoid")
+        return _calibration_cache['value']
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate cross-encoder relevance scores")
+    parser.add_argument("--labels", type=Path, help="CSV of query,question,answer,relevant rows (defaults to pairs built from the knowledge base)")
+    parser.add_argument("--sample", type=int, default=300, help="Knowledge-base questions sampled when no labels are given")
+    args = parser.parse_args()
+
+    from .model_registry import get_bi_encoder, get_cross_encoder
+    if args.labels:
+        pairs, source = read_labelled_pairs(args.labels), str(args.labels)
+    else:
+        from .exact_match import ExactQuestionIndex
+        entries = ExactQuestionIndex.load().entries.values()
+        pairs = knowledge_base_pairs(entries, lambda texts: get_bi_encoder().encode(texts), sample_size=args.sample)
+        source = "knowledge_base"
+    calibrate(pairs, get_cross_encoder(), source=source)
+
+if __name__ == "__main__":
+    main()
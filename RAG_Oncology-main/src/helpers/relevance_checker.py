@@ -1,7 +1,52 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from langchain.schema import HumanMessage
+import asyncio
+import json
+import logging
+import math
+import re
 
-from src.llm_factory.gemini import GoogleGen
+from src.llm_factory.gemini import GoogleGen, count_llm_calls
+from src.helpers.concurrency import gather_bounded, map_bounded
+from src.config.settings import (
+    LLM_CONCURRENCY_LIMIT, LLM_CALL_TIMEOUT, RELEVANCE_BATCH_MODE, RELEVANCE_SCORE_GATING,
+    RELEVANCE_ACCEPT_SCORE, RELEVANCE_REJECT_SCORE, RELEVANCE_CE_ACCEPT_SCORE, RELEVANCE_CE_REJECT_SCORE,
+    RELEVANCE_STRATEGY, RELEVANCE_CE_THRESHOLD, RELEVANCE_HYBRID_ACCEPT_PROB, RELEVANCE_HYBRID_REJECT_PROB,
+    RELEVANCE_CE_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+def _relevance_prompt(query: str, search_result: Dict[str, Any]) -> str:
+    """Build the yes/no relevance prompt for a single search result."""
+    return f"""You are a medical information assistant. 
+        Determine if the following text is relevant to the user's query.
+        
+        Query: {query}
+        
+        Text: {search_result['question']}
+            
+        Respond with ONLY 'yes' or 'no'."""
+
+def _ask_relevance(query: str, search_result: Dict[str, Any], llm) -> Optional[bool]:
+    """LLM verdict on one search result, None if the call failed."""
+    try:
+        prompt = _relevance_prompt(query, search_result)
+        response = llm([HumanMessage(content=prompt)], prompt_type='relevance')
+        return response.content.strip().lower().startswith('yes')
+    except Exception as e:
+        logger.error(f"Error checking relevance: {str(e)}")
+        return None
+
+async def _aask_relevance(query: str, search_result: Dict[str, Any], llm) -> Optional[bool]:
+    """Async variant of _ask_relevance."""
+    try:
+        prompt = _relevance_prompt(query, search_result)
+        response = await llm.ainvoke([HumanMessage(content=prompt)], prompt_type='relevance')
+        return response.content.strip().lower().startswith('yes')
+    except Exception as e:
+        logger.error(f"Error checking relevance: {str(e)}")
+        return None
 
 def check_relevance(query: str, search_result: Dict[str, Any], llm=None) -> bool:
     """
@@ -18,22 +63,434 @@ def check_relevance(query: str, search_result: Dict[str, Any], llm=None) -> bool
     if not search_result:
         return False
     
-    llm = llm or GoogleGen()
+    return bool(_ask_relevance(query, search_result, llm or GoogleGen()))
+
+async def acheck_relevance(query: str, search_result: Dict[str, Any], llm=None) -> bool:
+    """
+    Async variant of check_relevance that does not block the event loop.
     
-    try:
-        prompt = f"""You are a medical information assistant. 
-        Determine if the following text is relevant to the user's query.
+    Args:
+        query: The user's query
+        search_result: A search result from the document retriever
+        llm: Optional LLM instance (defaults to GoogleGen)
+        
+    Returns:
+        bool
+    """
+    if not search_result:
+        return False
+    
+    return bool(await _aask_relevance(query, search_result, llm or GoogleGen()))
+
+def as_bool(value: Any) -> bool:
+    """
+    Read a boolean from a JSON answer of the LLM.
+    
+    Models sometimes quote their booleans; the strings 'true' and 'yes' are
+    true and every other string is false.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes')
+    return bool(value)
+
+def _batch_relevance_prompt(query: str, search_results: List[Dict[str, Any]]) -> str:
+    """Build a single prompt asking for a relevance verdict on every search result."""
+    texts = "\n".join(
+        f"{i}. {result['question']}" for i, result in enumerate(search_results, 1)
+    )
+    return f"""You are a medical information assistant. 
+        For each numbered text below, determine if it is relevant to the user's query.
         
         Query: {query}
         
-        Text: {search_result['question']}
-            
-        Respond with ONLY 'yes' or 'no'."""
-            
-        response = llm([HumanMessage(content=prompt)])
-        if response.content.strip().lower().startswith('yes'):
-            return True
+        Texts:
+        {texts}
+        
+        Respond with ONLY a JSON object with one entry per text, in this format:
+        {{"judgements": [{{"id": 1, "relevant": true}}, {{"id": 2, "relevant": false}}]}}"""
+
+def _parse_batch_judgements(content: str, count: int) -> Optional[List[bool]]:
+    """
+    Parse the batched relevance answer.
+    
+    Returns:
+        One verdict per search result, in order, or None if the answer is
+        not valid JSON or does not cover every result exactly once
+    """
+    try:
+        data = json.loads(re.search(r'\{.*\}', content, re.DOTALL).group())
+        verdicts = {}
+        for item in data['judgements']:
+            verdicts[int(item['id'])] = as_bool(item['relevant'])
+    except Exception:
+        return None
+    
+    if set(verdicts) != set(range(1, count + 1)):
+        return None
+    return [verdicts[i] for i in range(1, count + 1)]
+
+def _check_batch(query: str, search_results: List[Dict[str, Any]], llm) -> List[Optional[bool]]:
+    """Batched verdicts, falling back to one call per result; None marks a failed check."""
+    try:
+        prompt = _batch_relevance_prompt(query, search_results)
+        response = llm([HumanMessage(content=prompt)], prompt_type='relevance_batch')
+        verdicts = _parse_batch_judgements(response.content, len(search_results))
+        if verdicts is not None:
+            return verdicts
+        logger.warning("Could not parse batched relevance judgements, checking results one by one")
     except Exception as e:
-        print(f"Error checking relevance: {e}")
+        logger.error(f"Error checking relevance in one batch, checking results one by one: {str(e)}")
+    return _check_each(query, search_results, llm)
+
+async def _acheck_batch(query: str, search_results: List[Dict[str, Any]], llm) -> List[Optional[bool]]:
+    """Async variant of _check_batch."""
+    try:
+        prompt = _batch_relevance_prompt(query, search_results)
+        response = await llm.ainvoke([HumanMessage(content=prompt)], prompt_type='relevance_batch')
+        verdicts = _parse_batch_judgements(response.content, len(search_results))
+        if verdicts is not None:
+            return verdicts
+        logger.warning("Could not parse batched relevance judgements, checking results one by one")
+    except Exception as e:
+        logger.error(f"Error checking relevance in one batch, checking results one by one: {str(e)}")
+    return await _acheck_each(query, search_results, llm)
+
+def _check_each(query: str, search_results: List[Dict[str, Any]], llm) -> List[Optional[bool]]:
+    """Concurrent per-result verdicts; None marks a call that failed or timed out."""
+    return map_bounded(
+        lambda result: _ask_relevance(query, result, llm),
+        search_results,
+        limit=LLM_CONCURRENCY_LIMIT,
+        timeout=LLM_CALL_TIMEOUT,
+        default=None
+    )
+
+async def _acheck_each(query: str, search_results: List[Dict[str, Any]], llm) -> List[Optional[bool]]:
+    """Async variant of _check_each."""
+    return await gather_bounded(
+        lambda result: _aask_relevance(query, result, llm),
+        search_results,
+        limit=LLM_CONCURRENCY_LIMIT,
+        timeout=LLM_CALL_TIMEOUT,
+        default=None
+    )
+
+def check_relevance_batch(query: str, search_results: List[Dict[str, Any]], llm=None) -> List[bool]:
+    """
+    Check the relevance of all search results with a single LLM call.
+    
+    Falls back to one check_relevance call per result if the batched
+    call fails or its answer cannot be parsed.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        llm: Optional LLM instance (defaults to GoogleGen)
+        
+    Returns:
+        List[bool]: One verdict per search result, in the same order
+    """
+    if not search_results:
+        return []
+    return [bool(verdict) for verdict in _check_batch(query, search_results, llm or GoogleGen())]
+
+async def acheck_relevance_batch(query: str, search_results: List[Dict[str, Any]], llm=None) -> List[bool]:
+    """
+    Async variant of check_relevance_batch.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        llm: Optional LLM instance (defaults to GoogleGen)
+        
+    Returns:
+        List[bool]: One verdict per search result, in the same order
+    """
+    if not search_results:
+        return []
+    return [bool(verdict) for verdict in await _acheck_batch(query, search_results, llm or GoogleGen())]
+
+def check_relevance_each(query: str, search_results: List[Dict[str, Any]], llm=None) -> List[bool]:
+    """
+    Check each search result with its own LLM call, running the calls concurrently.
+    
+    Concurrency and per-call timeout come from LLM_CONCURRENCY_LIMIT and
+    LLM_CALL_TIMEOUT; a call that fails or times out counts as not relevant.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        llm: Optional LLM instance shared by all calls (defaults to GoogleGen)
+        
+    Returns:
+        List[bool]: One verdict per search result, in the same order
+    """
+    if not search_results:
+        return []
+    return [bool(verdict) for verdict in _check_each(query, search_results, llm or GoogleGen())]
+
+async def acheck_relevance_each(query: str, search_results: List[Dict[str, Any]], llm=None) -> List[bool]:
+    """
+    Async variant of check_relevance_each.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        llm: Optional LLM instance shared by all calls (defaults to GoogleGen)
+        
+    Returns:
+        List[bool]: One verdict per search result, in the same order
+    """
+    if not search_results:
+        return []
+    return [bool(verdict) for verdict in await _acheck_each(query, search_results, llm or GoogleGen())]
+
+
+def score_gate(search_result: Dict[str, Any]) -> Optional[bool]:
+    """
+    Decide relevance from the retrieval scores alone.
+    
+    The cross-encoder score is used when present, the bi-encoder cosine
+    similarity otherwise.
+    
+    Returns:
+        True above the accept threshold, False below the reject threshold,
+        None in between (the LLM decides)
+    """
+    if not RELEVANCE_SCORE_GATING:
+        return None
+    if search_result.get('cross_encoder_score') is not None:
+        score = search_result['cross_encoder_score']
+        accept, reject = RELEVANCE_CE_ACCEPT_SCORE, RELEVANCE_CE_REJECT_SCORE
+    elif search_result.get('score') is not None:
+        score = search_result['score']
+        accept, reject = RELEVANCE_ACCEPT_SCORE, RELEVANCE_REJECT_SCORE
+    else:
+        return None
+    
+    if score >= accept:
+        return True
+    if score < reject:
+        return False
+    return None
+
+def _gate_stats(
+    local_verdicts: List[Optional[bool]],
+    batch: bool,
+    llm_calls: int,
+    llm_verdicts: List[Optional[bool]]
+) -> Dict[str, int]:
+    """
+    Count local decisions, the LLM calls made and the checks that failed.
+    
+    Args:
+        local_verdicts: Verdict reached without the LLM for each result, None if none
+        batch: Whether the uncertain results were checked in one call
+        llm_calls: LLM calls actually made, as counted by count_llm_calls
+        llm_verdicts: LLM verdict of each uncertain result, None where the check failed
+        
+    Returns:
+        Counts; `llm_calls_avoided` is the number of checks the local
+        verdicts saved (one per result, or the whole batch call), and
+        `llm_errors` the results whose check failed or timed out (they
+        count as not relevant)
+    """
+    uncertain = sum(verdict is None for verdict in local_verdicts)
+    if batch:
+        calls_avoided = 1 if local_verdicts and not uncertain else 0
+    else:
+        calls_avoided = len(local_verdicts) - uncertain
+    return {
+        "candidates": len(local_verdicts),
+        "accepted_locally": sum(verdict is True for verdict in local_verdicts),
+        "rejected_locally": sum(verdict is False for verdict in local_verdicts),
+        "sent_to_llm": uncertain,
+        "llm_calls": llm_calls,
+        "llm_calls_avoided": calls_avoided,
+        "llm_errors": sum(verdict is None for verdict in llm_verdicts),
+    }
+
+def _merge_verdicts(local_verdicts: List[Optional[bool]], llm_verdicts: List[Optional[bool]]) -> List[bool]:
+    llm_verdicts = iter(llm_verdicts)
+    return [bool(next(llm_verdicts)) if verdict is None else verdict for verdict in local_verdicts]
+
+def check_relevance_gated(
+    query: str,
+    search_results: List[Dict[str, Any]],
+    llm=None,
+    batch: bool = RELEVANCE_BATCH_MODE
+) -> Tuple[List[bool], Dict[str, int]]:
+    """
+    Accept or reject confident results from their scores; ask the LLM about the rest.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever, with scores
+        llm: Optional LLM instance (defaults to GoogleGen)
+        batch: Check the uncertain results in one call instead of one call each
         
-    return False
+    Returns:
+        One verdict per search result, in order, and the gate statistics
+    """
+    local_verdicts = [score_gate(result) for result in search_results]
+    uncertain = [result for result, verdict in zip(search_results, local_verdicts) if verdict is None]
+    llm_verdicts = []
+    with count_llm_calls() as llm_calls:
+        if uncertain:
+            check = _check_batch if batch else _check_each
+            llm_verdicts = check(query, uncertain, llm or GoogleGen())
+    return _merge_verdicts(local_verdicts, llm_verdicts), _gate_stats(local_verdicts, batch, llm_calls.total, llm_verdicts)
+
+async def acheck_relevance_gated(
+    query: str,
+    search_results: List[Dict[str, Any]],
+    llm=None,
+    batch: bool = RELEVANCE_BATCH_MODE
+) -> Tuple[List[bool], Dict[str, int]]:
+    """
+    Async variant of check_relevance_gated.
+    
+    Returns:
+        One verdict per search result, in order, and the gate statistics
+    """
+    local_verdicts = [score_gate(result) for result in search_results]
+    uncertain = [result for result, verdict in zip(search_results, local_verdicts) if verdict is None]
+    llm_verdicts = []
+    with count_llm_calls() as llm_calls:
+        if uncertain:
+            check = _acheck_batch if batch else _acheck_each
+            llm_verdicts = await check(query, uncertain, llm or GoogleGen())
+    return _merge_verdicts(local_verdicts, llm_verdicts), _gate_stats(local_verdicts, batch, llm_calls.total, llm_verdicts)
+
+def _sigmoid(logit: float) -> float:
+    if logit >= 0:
+        return 1.0 / (1.0 + math.exp(-logit))
+    z = math.exp(logit)
+    return z / (1.0 + z)
+
+def cross_encoder_probabilities(query: str, search_results: List[Dict[str, Any]]) -> List[float]:
+    """
+    Relevance probability of every search result from one cross-encoder pass.
+    
+    Results already re-ranked by the retriever reuse their `cross_encoder_score`;
+    the others are scored together in a single batched `predict`. Logits go
+    through the calibration fitted at ingestion, or a plain sigmoid when
+    there is none.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        
+    Returns:
+        Relevance probability of each result, in order
+    """
+    logits = [result.get('cross_encoder_score') for result in search_results]
+    missing = [i for i, logit in enumerate(logits) if logit is None]
+    if missing:
+        from src.helpers.model_registry import get_cross_encoder
+        pairs = [
+            (query, f"Question: {search_results[i]['question']}\nAnswer: {search_results[i]['answer']}")
+            for i in missing
+        ]
+        scores = get_cross_encoder().predict(pairs, batch_size=RELEVANCE_CE_BATCH_SIZE, show_progress_bar=False)
+        for i, score in zip(missing, scores):
+            search_results[i]['cross_encoder_score'] = logits[i] = float(score)
+    from src.helpers.relevance_calibration import get_relevance_calibration
+    calibration = get_relevance_calibration()
+    if calibration is not None:
+        return [float(probability) for probability in calibration.probabilities(logits)]
+    return [_sigmoid(logit) for logit in logits]
+
+def _local_verdicts(
+    strategy: str,
+    search_results: List[Dict[str, Any]],
+    probabilities: Optional[List[float]]
+) -> List[Optional[bool]]:
+    """Verdicts the strategy reaches without the LLM; None leaves the result to the LLM."""
+    if strategy == 'cross_encoder':
+        return [probability >= RELEVANCE_CE_THRESHOLD for probability in probabilities]
+    if strategy == 'hybrid':
+        return [
+            True if probability >= RELEVANCE_HYBRID_ACCEPT_PROB
+            else False if probability <= RELEVANCE_HYBRID_REJECT_PROB
+            else None
+            for probability in probabilities
+        ]
+    return [score_gate(result) for result in search_results]
+
+def _strategy_stats(
+    local_verdicts: List[Optional[bool]],
+    batch: bool,
+    strategy: str,
+    llm_calls: int,
+    llm_verdicts: List[Optional[bool]]
+) -> Dict[str, Any]:
+    stats = _gate_stats(local_verdicts, batch, llm_calls, llm_verdicts)
+    stats["strategy"] = strategy
+    return stats
+
+def check_relevance_with_strategy(
+    query: str,
+    search_results: List[Dict[str, Any]],
+    llm=None,
+    strategy: str = RELEVANCE_STRATEGY,
+    batch: bool = RELEVANCE_BATCH_MODE
+) -> Tuple[List[bool], Dict[str, Any]]:
+    """
+    Decide relevance with the configured strategy.
+    
+    'llm' gates on the retrieval scores and asks the LLM about the rest,
+    'cross_encoder' decides everything locally with one batched cross-encoder
+    pass, and 'hybrid' lets the cross-encoder decide confident results and the
+    LLM the uncertain band.
+    
+    Args:
+        query: The user's query
+        search_results: Search results from the document retriever
+        llm: Optional LLM instance (defaults to GoogleGen)
+        strategy: 'llm', 'cross_encoder' or 'hybrid'
+        batch: Check the uncertain results in one call instead of one call each
+        
+    Returns:
+        One verdict per search result, in order, and the gate statistics
+    """
+    if strategy not in ('cross_encoder', 'hybrid'):
+        verdicts, stats = check_relevance_gated(query, search_results, llm, batch)
+        return verdicts, dict(stats, strategy='llm')
+    
+    probabilities = cross_encoder_probabilities(query, search_results)
+    local_verdicts = _local_verdicts(strategy, search_results, probabilities)
+    uncertain = [result for result, verdict in zip(search_results, local_verdicts) if verdict is None]
+    llm_verdicts = []
+    with count_llm_calls() as llm_calls:
+        if uncertain:
+            check = _check_batch if batch else _check_each
+            llm_verdicts = check(query, uncertain, llm or GoogleGen())
+    return _merge_verdicts(local_verdicts, llm_verdicts), _strategy_stats(local_verdicts, batch, strategy, llm_calls.total, llm_verdicts)
+
+async def acheck_relevance_with_strategy(
+    query: str,
+    search_results: List[Dict[str, Any]],
+    llm=None,
+    strategy: str = RELEVANCE_STRATEGY,
+    batch: bool = RELEVANCE_BATCH_MODE
+) -> Tuple[List[bool], Dict[str, Any]]:
+    """
+    Async variant of check_relevance_with_strategy; the cross-encoder runs in a worker thread.
+    
+    Returns:
+        One verdict per search result, in order, and the gate statistics
+    """
+    if strategy not in ('cross_encoder', 'hybrid'):
+        verdicts, stats = await acheck_relevance_gated(query, search_results, llm, batch)
+        return verdicts, dict(stats, strategy='llm')
+    
+    probabilities = await asyncio.to_thread(cross_encoder_probabilities, query, search_results)
+    local_verdicts = _local_verdicts(strategy, search_results, probabilities)
+    uncertain = [result for result, verdict in zip(search_results, local_verdicts) if verdict is None]
+    llm_verdicts = []
+    with count_llm_calls() as llm_calls:
+        if uncertain:
+            check = _acheck_batch if batch else _acheck_each
+            llm_verdicts = await check(query, uncertain, llm or GoogleGen())
+    return _merge_verdicts(local_verdicts, llm_verdicts), _strategy_stats(local_verdicts, batch, strategy, llm_calls.total, llm_verdicts)
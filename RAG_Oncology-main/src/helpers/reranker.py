@@ -0,0 +1,143 @@
+"""Batched cross-encoder re-ranking with a cache of query/document scores."""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from .kb_version import VersionedResource
+from .model_registry import get_cross_encoder
+from .numpy_store import top_k
+from src.config.settings import RERANK_BATCH_SIZE, RERANK_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# (document, bi-encoder score) pairs as returned by the retrieval backends
+Candidate = Tuple[Document, float]
+# (document, bi-encoder score, cross-encoder score), best first
+RankedCandidate = Tuple[Document, float, float]
+
+def _query_hash(query: str) -> str:
+    return hashlib.sha256(" ".join(query.split()).encode('utf-8')).hexdigest()[:32]
+
+def _document_id(doc: Document) -> str:
+    """Stored document ID, or a hash of the content for documents without one."""
+    doc_id = getattr(doc, 'id', None)
+    if doc_id:
+        return doc_id
+    return hashlib.sha256(doc.page_content.encode('utf-8')).hexdigest()[:32]
+
+class CrossEncoderReranker:
+    """
+    Re-ranks retrieval candidates with the cross-encoder.
+
+    Scores are cached per (query hash, document ID), so a query re-ranked
+    again only scores the candidates it has not seen. Missing pairs of all
+    queries go through the cross-encoder in a single batched `predict`, and
+    only the k best candidates of each query are sorted.
+    """
+
+    def __init__(self, model: Optional[Any] = None, batch_size: int = 32, cache_size: int = 10000):
+        self._model = model
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._predict_calls = 0
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            self._model = get_cross_encoder()
+        return self._model
+
+    def score_many(self, queries: Sequence[str], documents: Sequence[Sequence[Document]]) -> List[np.ndarray]:
+        """
+        Cross-encoder scores of every document against its query.
+
+        Args:
+            queries: Queries
+            documents: Documents to score, one list per query
+
+        Returns:
+            One float32 array of raw cross-encoder logits per query
+        """
+        scores = [np.empty(len(docs), dtype=np.float32) for docs in documents]
+        missing: List[Tuple[int, int, Tuple[str, str]]] = []
+        pairs: List[Tuple[str, str]] = []
+        with self._lock:
+            for q, (query, docs) in enumerate(zip(queries, documents)):
+                query_hash = _query_hash(query)
+                for d, doc in enumerate(docs):
+                    key = (query_hash, _document_id(doc))
+                    cached = self._scores.get(key)
+                    if cached is None:
+                        missing.append((q, d, key))
+                        pairs.append((query, doc.page_content))
+                    else:
+                        self._scores.move_to_end(key)
+                        scores[q][d] = cached
+            self._hits += sum(len(docs) for docs in documents) - len(missing)
+            self._misses += len(missing)
+
+        if pairs:
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                self._predict_calls += 1
+                for (q, d, key), score in zip(missing, predicted):
+                    scores[q][d] = score
+                    self._scores[key] = float(score)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+        return scores
+
+    def rerank_many(self, queries: Sequence[str], candidates: Sequence[Sequence[Candidate]], k: int) -> List[List[RankedCandidate]]:
+        """
+        Keep the k best candidates of each query by cross-encoder score.
+
+        Args:
+            queries: Queries
+            candidates: (document, bi-encoder score) pairs, one list per query
+            k: Results kept per query
+
+        Returns:
+            (document, bi-encoder score, cross-encoder score) triples per query, best first
+        """
+        scores = self.score_many(queries, [[doc for doc, _ in pairs] for pairs in candidates])
+        return [
+            [(pairs[i][0], pairs[i][1], float(query_scores[i])) for i in top_k(query_scores, k)]
+            for pairs, query_scores in zip(candidates, scores)
+        ]
+
+    def rerank(self, query: str, candidates: Sequence[Candidate], k: int) -> List[RankedCandidate]:
+        """Keep the k best candidates of one query; see rerank_many."""
+        return self.rerank_many([query], [candidates], k)[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return score cache statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._scores),
+                "max_entries": self.cache_size,
+                "batch_size": self.batch_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "predict_calls": self._predict_calls,
+            }
+
+# Shared reranker; its score cache is dropped when the knowledge base is rebuilt
+_reranker = VersionedResource(
+    lambda: CrossEncoderReranker(batch_size=RERANK_BATCH_SIZE, cache_size=RERANK_CACHE_SIZE),
+    name="cross-encoder reranker"
+)
+
+def get_reranker() -> CrossEncoderReranker:
+    """Return the shared cross-encoder reranker."""
+    return _reranker.get()
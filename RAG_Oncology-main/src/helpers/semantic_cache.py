@@ -0,0 +1,217 @@
+"""Semantic answer cache keyed on query embeddings."""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .kb_version import read_kb_version
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheEntry:
+    query: str
+    context_key: Any
+    embedding: np.ndarray
+    response: str
+    answer: str
+    sources: List[Dict[str, Any]]
+    created_at: float = field(default_factory=time.time)
+    size_bytes: int = 0
+
+class SemanticCache:
+    """
+    Reuse answers for questions that are worded differently but mean the same.
+
+    A lookup embeds the query with the bi-encoder and returns the stored answer
+    of the most similar cached query when the cosine similarity is above
+    `similarity_threshold` and the entry was produced for the same context
+    (the patient the answer was personalised for). Entries are evicted in LRU
+    order when the entry or memory cap is exceeded, expire after
+    `ttl_seconds`, and are all dropped when the knowledge base is rebuilt.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Any],
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: float = 24 * 3600,
+        max_memory_mb: float = 64,
+        kb_check_interval: float = 5.0
+    ):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.kb_check_interval = kb_check_interval
+
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._memory_bytes = 0
+        self._kb_version = read_kb_version()
+        self._kb_checked_at = time.monotonic()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = {"lru": 0, "ttl": 0, "memory": 0}
+        self._invalidations = 0
+
+    def embed(self, query: str) -> np.ndarray:
+        """Return the normalized float32 embedding of a query."""
+        embedding = np.asarray(self.embed_fn(query), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def lookup(self, embedding: np.ndarray, context_key: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a query embedding.
+
+        Args:
+            embedding: Normalized query embedding (see embed)
+            context_key: Context the answer must have been produced for
+
+        Returns:
+            Dict with response, answer, sources, cached query and similarity,
+            or None on a miss
+        """
+        with self._lock:
+            self._check_kb_version()
+            self._expire()
+
+            candidates = [
+                (entry_id, entry) for entry_id, entry in self._entries.items()
+                if entry.context_key == context_key
+            ]
+            if not candidates:
+                self._misses += 1
+                return None
+
+            matrix = np.stack([entry.embedding for _, entry in candidates])
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.similarity_threshold:
+                self._misses += 1
+                return None
+
+            entry_id, entry = candidates[best]
+            self._entries.move_to_end(entry_id)
+            self._hits += 1
+            return {
+                "response": entry.response,
+                "answer": entry.answer,
+                "sources": entry.sources,
+                "cached_query": entry.query,
+                "similarity": similarity,
+            }
+
+    def store(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        response: str,
+        answer: str,
+        sources: List[Dict[str, Any]],
+        context_key: Any = None
+    ) -> None:
+        """Cache the answer produced for a query."""
+        size_bytes = (
+            embedding.nbytes
+            + len(query) + len(response) + len(answer)
+            + sum(len(str(source.get('question', ''))) + len(str(source.get('answer', ''))) for source in sources)
+        )
+        if size_bytes > self.max_memory_bytes:
+            return
+
+        entry = CacheEntry(
+            query=query,
+            context_key=context_key,
+            embedding=embedding.astype(np.float32, copy=False),
+            response=response,
+            answer=answer,
+            sources=sources,
+            size_bytes=size_bytes
+        )
+        with self._lock:
+            self._check_kb_version()
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            self._memory_bytes += size_bytes
+
+            while len(self._entries) > self.max_entries:
+                self._pop_oldest("lru")
+            while self._memory_bytes > self.max_memory_bytes and self._entries:
+                self._pop_oldest("memory")
+
+    def invalidate(self, context_key: Any = None) -> int:
+        """
+        Drop cached answers.
+
+        Args:
+            context_key: Only drop entries of this context (None drops everything)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if context_key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._memory_bytes = 0
+            else:
+                stale = [entry_id for entry_id, entry in self._entries.items() if entry.context_key == context_key]
+                for entry_id in stale:
+                    self._memory_bytes -= self._entries.pop(entry_id).size_bytes
+                removed = len(stale)
+            self._invalidations += 1
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate and size metrics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": dict(self._evictions),
+                "invalidations": self._invalidations,
+            }
+
+    def _pop_oldest(self, reason: str) -> None:
+        _, entry = self._entries.popitem(last=False)
+        self._memory_bytes -= entry.size_bytes
+        self._evictions[reason] += 1
+
+    def _expire(self) -> None:
+        """Drop entries older than the TTL (caller holds the lock)."""
+        if self.ttl_seconds is None or self.ttl_seconds <= 0:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.created_at < cutoff]
+        for entry_id in expired:
+            self._memory_bytes -= self._entries.pop(entry_id).size_bytes
+            self._evictions["ttl"] += 1
+
+    def _check_kb_version(self) -> None:
+        """Clear the cache if the knowledge base was rebuilt (caller holds the lock)."""
+        now = time.monotonic()
+        if now - self._kb_checked_at < self.kb_check_interval:
+            return
+        self._kb_checked_at = now
+        version = read_kb_version()
+        if version != self._kb_version:
+            logger.info("Knowledge base changed, clearing semantic cache")
+            self._kb_version = version
+            self._entries.clear()
+            self._memory_bytes = 0
+            self._invalidations += 1
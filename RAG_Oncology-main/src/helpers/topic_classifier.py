@@ -0,0 +1,188 @@
+"""Local oncology topic classifier over bi-encoder embeddings."""
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import TOPIC_CLASSIFIER_FILE
+from .embedding_cache import query_embedding_cache
+from .kb_version import VersionedResource
+from .model_registry import get_bi_encoder
+from src.config.settings import TOPIC_ACCEPT_PROB, TOPIC_REJECT_PROB
+
+logger = logging.getLogger(__name__)
+
+# Negative set: everyday and general-health questions that are not about cancer
+OFF_TOPIC_EXAMPLES = (
+    "What is the weather like tomorrow?",
+    "How do I cook pasta al dente?",
+    "Who won the football match last night?",
+    "Can you recommend a good movie to watch?",
+    "How do I reset my email password?",
+    "What is the capital of Australia?",
+    "How can I improve my programming skills?",
+    "What time does the train station open?",
+    "How do I change a flat tyre?",
+    "What are some good exercises for beginners at the gym?",
+    "How many calories are in a banana?",
+    "How do I book a flight to Paris?",
+    "What is the best way to learn a new language?",
+    "Can you tell me a joke?",
+    "How do I grow tomatoes in my garden?",
+    "What is the difference between a virus and a bacterium in computers?",
+    "How much does a new smartphone cost?",
+    "How do I write a cover letter for a job application?",
+    "What are the rules of chess?",
+    "How do I open a bank account?",
+    "What is the history of the Roman Empire?",
+    "How can I sleep better at night?",
+    "What should I do for a common cold?",
+    "How do I treat a sprained ankle?",
+    "What are the symptoms of the flu?",
+    "How can I lower my blood pressure naturally?",
+    "Is coffee bad for my teeth?",
+    "How often should I visit the dentist?",
+    "What are the signs of diabetes?",
+    "How do I get rid of a headache?",
+    "What vaccines does my baby need?",
+    "How can I lose weight quickly?",
+    "What are the symptoms of an allergy to pollen?",
+    "How do I care for a newborn puppy?",
+    "What is the best laptop for students?",
+    "How do I fix a leaking tap?",
+    "What are good gift ideas for a birthday?",
+    "How do I calculate compound interest?",
+    "Translate 'good morning' into Spanish.",
+    "What is the plot of Hamlet?",
+    "How do I install Python on Windows?",
+    "Where can I watch the news online?",
+    "What is the speed of light?",
+    "How do I make a budget spreadsheet?",
+    "What are the opening hours of the pharmacy?",
+    "How do I treat a mild sunburn?",
+    "What causes back pain after sitting all day?",
+    "How do I stop snoring?",
+    "How much water should I drink each day?",
+    "What are the benefits of meditation?",
+)
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+class TopicClassifier:
+    """
+    Logistic regression telling oncology questions apart from everything else.
+
+    Trained on the knowledge-base questions (positives) and OFF_TOPIC_EXAMPLES
+    (negatives), with class weights balancing the two. Scoring a question is
+    one dot product on its cached embedding.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    def predict_proba(self, embeddings: np.ndarray) -> np.ndarray:
+        """Probability that each embedding is an oncology question."""
+        return _sigmoid(np.asarray(embeddings, dtype=np.float32) @ self.weights + self.bias)
+
+    @classmethod
+    def train(
+        cls,
+        positives: np.ndarray,
+        negatives: np.ndarray,
+        iterations: int = 500,
+        learning_rate: float = 2.0,
+        l2: float = 1e-3
+    ) -> "TopicClassifier":
+        """
+        Fit the classifier with full-batch gradient descent.
+
+        Args:
+            positives: Embeddings of oncology questions
+            negatives: Embeddings of off-topic questions
+            iterations: Gradient steps
+            learning_rate: Step size
+            l2: Weight decay
+
+        Returns:
+            TopicClassifier
+        """
+        features = np.vstack([positives, negatives]).astype(np.float32)
+        labels = np.concatenate([np.ones(len(positives)), np.zeros(len(negatives))]).astype(np.float32)
+        sample_weights = np.where(labels == 1, len(labels) / (2 * len(positives)), len(labels) / (2 * len(negatives)))
+
+        weights = np.zeros(features.shape[1], dtype=np.float32)
+        bias = 0.0
+        for _ in range(iterations):
+            errors = sample_weights * (_sigmoid(features @ weights + bias) - labels)
+            weights -= learning_rate * (features.T @ errors / len(labels) + l2 * weights)
+            bias -= learning_rate * float(errors.mean())
+        return cls(weights, bias)
+
+    def save(self, path: Path = TOPIC_CLASSIFIER_FILE) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez(file, weights=self.weights, bias=np.float32(self.bias))
+
+    @classmethod
+    def load(cls, path: Path = TOPIC_CLASSIFIER_FILE) -> Optional["TopicClassifier"]:
+        try:
+            with np.load(path) as data:
+                return cls(data['weights'], float(data['bias']))
+        except FileNotFoundError:
+            logger.warning(f"No topic classifier at {path}, every topic check goes to the LLM")
+            return None
+
+def train_topic_classifier(
+    questions: Sequence[str],
+    embed: Callable[[List[str]], np.ndarray],
+    max_positives: int = 5000,
+    path: Path = TOPIC_CLASSIFIER_FILE,
+    seed: int = 0
+) -> TopicClassifier:
+    """
+    Train the classifier from knowledge-base questions and save it.
+
+    Args:
+        questions: Knowledge-base questions
+        embed: Embeds a list of texts, returning a (n, dim) array
+        max_positives: Questions sampled for training
+        path: Where to save the weights
+        seed: Random seed of the sample
+
+    Returns:
+        TopicClassifier
+    """
+    questions = list(questions)
+    if len(questions) > max_positives:
+        rng = np.random.default_rng(seed)
+        questions = [questions[i] for i in rng.choice(len(questions), size=max_positives, replace=False)]
+    classifier = TopicClassifier.train(embed(questions), embed(list(OFF_TOPIC_EXAMPLES)))
+    classifier.save(path)
+    logger.info(f"Topic classifier trained on {len(questions)} questions and {len(OFF_TOPIC_EXAMPLES)} negatives")
+    return classifier
+
+# Shared classifier, reloaded when the knowledge base is rebuilt
+_topic_classifier = VersionedResource(lambda: TopicClassifier.load(TOPIC_CLASSIFIER_FILE), name="topic classifier")
+
+def classify_topic(text: str) -> Tuple[Optional[bool], Optional[float]]:
+    """
+    Decide locally whether a question is about oncology.
+
+    Returns:
+        (True/False, probability) when the classifier is confident, or
+        (None, probability) for ambiguous questions that should go to the LLM
+    """
+    classifier = _topic_classifier.get()
+    if classifier is None:
+        return None, None
+    embedding = query_embedding_cache.encode(get_bi_encoder(), text)
+    probability = float(classifier.predict_proba(embedding))
+    if probability >= TOPIC_ACCEPT_PROB:
+        return True, probability
+    if probability <= TOPIC_REJECT_PROB:
+        return False, probability
+    return None, probability
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import LLM_CACHE_PATH, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM completions.
+
+    Keys are built from the model name, the temperature and a hash of the
+    message list. Lookups go to an in-process LRU first, then to a SQLite
+    table so cached answers survive restarts. Entries older than
+    `ttl_seconds` are treated as misses.
+    """
+
+    def __init__(self, db_path: Path, max_memory_entries: int = 2048, ttl_seconds: float = 7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, prompt_type TEXT, content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: List[Any]) -> str:
+        """Build the cache key of a request."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "messages": [
+                    [getattr(message, "type", type(message).__name__), getattr(message, "content", str(message))]
+                    for message in messages
+                ],
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, prompt_type: str = "default") -> Optional[Any]:
+        """Return the cached message content for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats[prompt_type]["memory_hits"] += 1
+                    return content
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT content, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                content, created_at = json.loads(row[0]), row[1]
+                if not self._expired(created_at, now):
+                    self._remember(key, content, created_at)
+                    self._stats[prompt_type]["disk_hits"] += 1
+                    return content
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+
+            self._stats[prompt_type]["misses"] += 1
+            return None
+
+    def set(self, key: str, content: Any, prompt_type: str = "default") -> None:
+        """Store the message content produced for a key."""
+        now = time.time()
+        try:
+            serialized = json.dumps(content, ensure_ascii=False)
+        except TypeError:
+            logger.warning("LLM response content is not serializable, not caching it")
+            return
+        with self._lock:
+            self._remember(key, content, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, prompt_type, content, created_at) VALUES (?, ?, ?, ?)",
+                (key, prompt_type, serialized, now),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters per prompt type."""
+        with self._lock:
+            per_type = {}
+            for prompt_type, counters in self._stats.items():
+                lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+                hits = counters["memory_hits"] + counters["disk_hits"]
+                per_type[prompt_type] = dict(counters, hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+            return {
+                "memory_entries": len(self._memory),
+                "prompt_types": per_type,
+            }
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, content: Any, created_at: float) -> None:
+        """Put an entry in the in-process tier (caller holds the lock)."""
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    db_path=LLM_CACHE_PATH,
+                    max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                    ttl_seconds=LLM_CACHE_TTL,
+                )
+    return _cache
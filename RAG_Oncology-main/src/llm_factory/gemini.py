@@ -1,25 +1,105 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import AIMessage
 from dotenv import load_dotenv
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
 import os
+import threading
 from pathlib import Path
 
+from src.config.settings import LLM_CACHE_ENABLED
+from src.llm_factory.cache import get_llm_cache
+
 # Load environment variables from .env file in the project root
 env_path = Path(__file__).resolve().parents[2] / '.env'
 load_dotenv(env_path)
 
+class LLMCallCounter:
+    """Counts the LLM calls made (cache hits excluded) per prompt type."""
+
+    def __init__(self, parent: Optional["LLMCallCounter"] = None):
+        self.by_type: Dict[str, int] = {}
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    def record(self, prompt_type: str) -> None:
+        with self._lock:
+            self.by_type[prompt_type] = self.by_type.get(prompt_type, 0) + 1
+        # Calls counted by a nested block also count for the enclosing one
+        if self.parent is not None:
+            self.parent.record(prompt_type)
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_type.values())
+
+_llm_call_counter: ContextVar[Optional[LLMCallCounter]] = ContextVar('llm_call_counter', default=None)
+
+@contextmanager
+def count_llm_calls():
+    """Count the GoogleGen calls made inside the block, including in threads started with a copied context."""
+    counter = LLMCallCounter(parent=_llm_call_counter.get())
+    token = _llm_call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _llm_call_counter.reset(token)
+
+def _record_call(prompt_type: str) -> None:
+    counter = _llm_call_counter.get()
+    if counter is not None:
+        counter.record(prompt_type)
+
 class GoogleGen:
-    def __init__(self, model='gemini-1.5-flash'):
+    def __init__(self, model='gemini-1.5-flash', use_cache=None):
         # Get API key from environment variables
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
             
+        self.model = model
+        self.temperature = 0.3
         self.llm = ChatGoogleGenerativeAI(
             model=model,
-            temperature=0.3,
+            temperature=self.temperature,
             max_output_tokens=2000,
             google_api_key=api_key  # Explicitly pass the API key
         )
+        
+        # Response cache is opt-in, per instance or globally via LLM_CACHE_ENABLED
+        if use_cache is None:
+            use_cache = LLM_CACHE_ENABLED
+        self.cache = get_llm_cache() if use_cache else None
     
-    def __call__(self, messages):
-        return self.llm.invoke(messages)
\ No newline at end of file
+    def __call__(self, messages, prompt_type='default'):
+        if self.cache is None:
+            _record_call(prompt_type)
+            return self.llm.invoke(messages)
+        
+        key = self.cache.make_key(self.model, self.temperature, messages)
+        content = self.cache.get(key, prompt_type)
+        if content is not None:
+            return AIMessage(content=content)
+        
+        _record_call(prompt_type)
+        response = self.llm.invoke(messages)
+        self.cache.set(key, response.content, prompt_type)
+        return response
+
+    async def ainvoke(self, messages, prompt_type='default'):
+        if self.cache is None:
+            _record_call(prompt_type)
+            return await self.llm.ainvoke(messages)
+        
+        key = self.cache.make_key(self.model, self.temperature, messages)
+        content = await asyncio.to_thread(self.cache.get, key, prompt_type)
+        if content is not None:
+            return AIMessage(content=content)
+        
+        _record_call(prompt_type)
+        response = await self.llm.ainvoke(messages)
+        await asyncio.to_thread(self.cache.set, key, response.content, prompt_type)
+        return response
+
@@ -1,6 +1,5 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
-from sentence_transformers import SentenceTransformer
 from langchain_core.messages import HumanMessage
 import numpy as np
 import json
@@ -8,7 +7,13 @@ import re
 import logging
 
 from src.helpers.document_retriever import search_qa
+from src.helpers.relevance_checker import as_bool
+from src.helpers.concurrency import map_bounded
+from src.helpers.embedding_cache import query_embedding_cache, get_document_embedding_cache
+from src.helpers.model_registry import get_bi_encoder
+from src.helpers.topic_classifier import classify_topic
 from src.llm_factory.gemini import GoogleGen
+from src.config.settings import LLM_CONCURRENCY_LIMIT, LLM_CALL_TIMEOUT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,20 +23,43 @@ class HybridRelevanceChecker:
     def __init__(self):
         """Simplified relevance checker for oncology with only direct matches"""
         self.llm = GoogleGen()
-        self.similarity_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.similarity_model = get_bi_encoder()
         
         # Thresholds
         self.similarity_threshold = 0.8
         self.confidence_threshold = 0.85
+        
+        # Candidate verifications run concurrently
+        self.max_concurrency = LLM_CONCURRENCY_LIMIT
+        self.call_timeout = LLM_CALL_TIMEOUT
+
+    def local_topic(self, text: str) -> Tuple[Optional[bool], Optional[float]]:
+        """Topic verdict of the local classifier; None when it is not confident"""
+        try:
+            on_topic, probability = classify_topic(text)
+        except Exception as e:
+            logger.error(f"Local topic check failed: {e}")
+            return None, None
+        if on_topic is not None:
+            logger.info(f"Topic decided locally (p={probability:.3f}): {'oncology' if on_topic else 'off topic'}")
+        return on_topic, probability
 
     def is_oncology_related(self, text: str) -> bool:
-        """Strict oncology content check"""
+        """Strict oncology content check
+        
+        The local topic classifier answers confident cases; only ambiguous
+        questions cost an LLM call.
+        """
+        on_topic, _ = self.local_topic(text)
+        if on_topic is not None:
+            return on_topic
+        
         prompt = """Is this text about cancer/oncology? Answer ONLY 'yes' or 'no'.
         
         Text: {text}""".format(text=text)
         
         try:
-            response = self.llm([HumanMessage(content=prompt)])
+            response = self.llm([HumanMessage(content=prompt)], prompt_type='oncology_topic')
             return response.content.strip().lower() == 'yes'
         except Exception as e:
             logger.error(f"Oncology check failed: {e}")
@@ -39,13 +67,44 @@ class HybridRelevanceChecker:
 
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity between texts"""
-        embeds = self.similarity_model.encode([text1, text2])
+        embeds = [
+            query_embedding_cache.encode(self.similarity_model, text1),
+            query_embedding_cache.encode(self.similarity_model, text2)
+        ]
         return float(np.dot(embeds[0], embeds[1]) / 
                    (np.linalg.norm(embeds[0]) * np.linalg.norm(embeds[1])))
 
-    def verify_match(self, query: str, candidate: Dict[str, Any]) -> Dict[str, Any]:
+    def _candidate_embeddings(self, questions: List[str]) -> np.ndarray:
+        """Embeddings of the candidate questions, read from the ingestion cache when possible"""
+        try:
+            embeddings, missing = get_document_embedding_cache().lookup(questions)
+        except Exception as e:
+            logger.error(f"Embedding cache lookup failed: {e}")
+            embeddings, missing = None, list(range(len(questions)))
+        if not missing:
+            return embeddings
+        
+        # Everything not cached is encoded in a single batch
+        encoded = np.asarray(self.similarity_model.encode([questions[i] for i in missing]), dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.zeros((len(questions), encoded.shape[1]), dtype=np.float32)
+        embeddings[missing] = encoded
+        return embeddings
+
+    def candidate_similarities(self, query: str, questions: List[str]) -> np.ndarray:
+        """Cosine similarity between the query and every candidate question"""
+        if not questions:
+            return np.empty(0, dtype=np.float32)
+        query_embedding = query_embedding_cache.encode(self.similarity_model, query)
+        embeddings = self._candidate_embeddings(questions)
+        norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
+        norms[norms == 0] = 1.0
+        return embeddings @ query_embedding / norms
+
+    def verify_match(self, query: str, candidate: Dict[str, Any], similarity: Optional[float] = None) -> Dict[str, Any]:
         """Verify if candidate is a direct match"""
-        similarity = self.calculate_similarity(query, candidate['question'])
+        if similarity is None:
+            similarity = self.calculate_similarity(query, candidate['question'])
         
         verification_prompt = """Verify if this answer perfectly matches the question.
         Question: {query}
@@ -60,8 +119,9 @@ class HybridRelevanceChecker:
         )
         
         try:
-            response = self.llm([HumanMessage(content=verification_prompt)])
+            response = self.llm([HumanMessage(content=verification_prompt)], prompt_type='verification')
             verification = json.loads(re.search(r'\{.*\}', response.content, re.DOTALL).group())
+            verification['match'] = as_bool(verification.get('match', False))
             
             return {
                 'similarity': similarity,
@@ -76,19 +136,47 @@ class HybridRelevanceChecker:
                 'combined_score': 0.0
             }
 
-    def check_match(self, query: str) -> Dict[str, Any]:
-        """Check for direct matches only"""
-        if not self.is_oncology_related(query):
+    def retrieve_candidates(self, query: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Search results for the query and their similarity to it"""
+        rag_results = search_qa(query=query, k=5)  # Fewer but more relevant results
+        # Query and candidates are embedded once, then compared in one matrix product
+        similarities = self.candidate_similarities(query, [candidate['question'] for candidate in rag_results])
+        return rag_results, similarities
+
+    def check_match(
+        self,
+        query: str,
+        on_topic: Optional[bool] = None,
+        candidates: Optional[Tuple[List[Dict[str, Any]], np.ndarray]] = None
+    ) -> Dict[str, Any]:
+        """Check for direct matches only
+        
+        Args:
+            query: The user's question
+            on_topic: Result of is_oncology_related when the caller already has it
+            candidates: Result of retrieve_candidates when the caller already has it
+        """
+        if on_topic is None:
+            on_topic = self.is_oncology_related(query)
+        if not on_topic:
             return {'status': 'off_topic', 'match_data': None}
         
-        rag_results = search_qa(query=query, k=5)  # Fewer but more relevant results
+        rag_results, similarities = candidates if candidates is not None else self.retrieve_candidates(query)
         if not rag_results:
             return {'status': 'no_match', 'match_data': None}
         
-        # Evaluate all candidates
+        # Evaluate all candidates concurrently; results keep the retrieval order
+        eval_results = map_bounded(
+            lambda item: self.verify_match(query, item[0], float(item[1])),
+            list(zip(rag_results, similarities)),
+            limit=self.max_concurrency,
+            timeout=self.call_timeout
+        )
+        
         evaluations = []
-        for candidate in rag_results:
-            eval_result = self.verify_match(query, candidate)
+        for candidate, eval_result in zip(rag_results, eval_results):
+            if eval_result is None:
+                continue
             if eval_result['verification']['match'] and eval_result['combined_score'] >= self.confidence_threshold:
                 evaluations.append({
                     'candidate': candidate,
@@ -99,7 +187,10 @@ class HybridRelevanceChecker:
         if not evaluations:
             return {'status': 'no_match', 'match_data': None}
         
-        # Return best direct match
+        return self._best_match(evaluations)
+
+    def _best_match(self, evaluations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return best direct match"""
         best_match = max(evaluations, key=lambda x: x['confidence'])
         return {
             'status': 'direct_match',
@@ -108,4 +199,101 @@ class HybridRelevanceChecker:
                 'confidence': best_match['confidence'],
                 'metrics': best_match['metrics']
             }
-        }
\ No newline at end of file
+        }
+
+    def _one_shot_prompt(self, query: str, candidates: List[Dict[str, Any]]) -> str:
+        """Single prompt asking for the topic verdict and a verification of every candidate"""
+        texts = "\n".join(
+            f"{i}. Question: {candidate['question']}\n   Answer: {candidate['answer']}"
+            for i, candidate in enumerate(candidates, 1)
+        ) or "(none)"
+        return """You are an oncology assistant. Given the user question and the numbered candidate answers:
+        1. Decide if the user question is about cancer/oncology.
+        2. For each candidate, verify if its answer perfectly matches the user question.
+        
+        User question: {query}
+        
+        Candidates:
+        {texts}
+        
+        Respond with ONLY a JSON object in this format:
+        {{"oncology": true, "candidates": [{{"id": 1, "match": true, "confidence": 0.9, "reason": "brief explanation"}}]}}""".format(
+            query=query,
+            texts=texts
+        )
+
+    def _parse_one_shot(self, content: str, count: int) -> Optional[Dict[str, Any]]:
+        """Parse the one-shot answer; None if it is not valid or misses a candidate"""
+        try:
+            data = json.loads(re.search(r'\{.*\}', content, re.DOTALL).group())
+            verifications = {
+                int(item['id']): {
+                    'match': as_bool(item['match']),
+                    'confidence': float(item['confidence']),
+                    'reason': item.get('reason', '')
+                }
+                for item in data.get('candidates', [])
+            }
+            oncology = as_bool(data['oncology'])
+        except Exception as e:
+            logger.error(f"Could not parse one-shot verification: {e}")
+            return None
+        if set(verifications) != set(range(1, count + 1)):
+            logger.error("One-shot verification does not cover every candidate")
+            return None
+        return {'oncology': oncology, 'verifications': [verifications[i] for i in range(1, count + 1)]}
+
+    def check_match_one_shot(
+        self,
+        query: str,
+        on_topic: Optional[bool] = None,
+        candidates: Optional[Tuple[List[Dict[str, Any]], np.ndarray]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Topic check and candidate verification in a single LLM call
+        
+        Args:
+            query: The user's question
+            on_topic: Topic verdict already known (e.g. from the local classifier)
+            candidates: Result of retrieve_candidates, so a fallback to
+                check_match can reuse it
+            
+        Returns:
+            Same result as check_match, or None if the answer could not be
+            used and the caller should fall back to check_match
+        """
+        if on_topic is False:
+            return {'status': 'off_topic', 'match_data': None}
+        
+        rag_results, similarities = candidates if candidates is not None else self.retrieve_candidates(query)
+        if not rag_results and on_topic:
+            return {'status': 'no_match', 'match_data': None}
+        
+        try:
+            response = self.llm([HumanMessage(content=self._one_shot_prompt(query, rag_results))], prompt_type='classify_verify')
+        except Exception as e:
+            logger.error(f"One-shot verification failed: {e}")
+            return None
+        parsed = self._parse_one_shot(response.content, len(rag_results))
+        if parsed is None:
+            return None
+        
+        if on_topic is None and not parsed['oncology']:
+            return {'status': 'off_topic', 'match_data': None}
+        
+        evaluations = []
+        for candidate, similarity, verification in zip(rag_results, similarities, parsed['verifications']):
+            combined_score = min(1.0, (float(similarity) + verification['confidence']) / 2)
+            if verification['match'] and combined_score >= self.confidence_threshold:
+                evaluations.append({
+                    'candidate': candidate,
+                    'metrics': {
+                        'similarity': float(similarity),
+                        'verification': verification,
+                        'combined_score': combined_score
+                    },
+                    'confidence': combined_score
+                })
+        
+        if not evaluations:
+            return {'status': 'no_match', 'match_data': None}
+        return self._best_match(evaluations)
\ No newline at end of file
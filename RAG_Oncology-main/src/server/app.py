@@ -1,27 +1,46 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
+import json
 import logging
-import time
 import traceback
 from datetime import datetime
 from sqlalchemy.orm import Session
 
-from src.agent_workflow.workflow import WorkFlow
+from src.agent_workflow.pool import WorkFlowPool
+from src.config.settings import (
+    WORKFLOW_POOL_SIZE, WORKFLOW_POOL_TIMEOUT,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_MAX_MB, LLM_CACHE_ENABLED, WARMUP_MODELS,
+    BACKGROUND_WARMUP
+)
+from src.config.logs import setup_logging
+from src.server.startup import StartupTracker
+from src.llm_factory.cache import get_llm_cache
+from src.helpers.model_registry import model_registry, get_bi_encoder
+from src.helpers.semantic_cache import SemanticCache
+from src.helpers.embedding_cache import query_embedding_cache
+from src.helpers.exact_match import exact_match_stats
 
 # Import database configuration and models
 from src.config.database import get_db, Base, engine
 from src.models.user_memory import UserMemory, init_db
 from src.helpers.user_memory_manager import UserMemoryManager
 
-# Initialize the database
-init_db()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the startup hook, so importing the app has no side effects
 logger = logging.getLogger(__name__)
 
+# Heavy libraries (LangGraph, Chroma, Gemini, sentence-transformers) are only
+# imported by the warm-up below, so importing this module stays fast
+startup_tracker = StartupTracker()
+startup_tracker.record('server_import', time.perf_counter() - _import_started)
+
 app = FastAPI(title="Cancer Agent API")
 
 # Add middleware for request logging
@@ -48,6 +67,58 @@ app.add_middleware(
 )
 
 # Initialize any required services here
+workflow_pool = WorkFlowPool(size=WORKFLOW_POOL_SIZE)
+semantic_cache = SemanticCache(
+    embed_fn=lambda text: query_embedding_cache.encode(get_bi_encoder(), text),
+    similarity_threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl_seconds=SEMANTIC_CACHE_TTL,
+    max_memory_mb=SEMANTIC_CACHE_MAX_MB
+) if SEMANTIC_CACHE_ENABLED else None
+# Response sources whose answers may be replayed from the semantic cache
+CACHEABLE_SOURCES = ('cancer_agent', 'exact_match')
+
+def _load_services():
+    """Import the workflow stack and load the models (blocking)"""
+    with startup_tracker.phase('imports'):
+        import src.agent_workflow.workflow  # noqa: F401
+    with startup_tracker.phase('models'):
+        model_registry.warm_up(WARMUP_MODELS)
+    with startup_tracker.phase('vector_store'):
+        from src.helpers.document_retriever import load_search_backend
+        load_search_backend()
+
+async def _warm_up(raise_errors: bool = False):
+    """Load the models and build the shared workflow instances"""
+    try:
+        await asyncio.to_thread(_load_services)
+        with startup_tracker.phase('workflow_pool'):
+            await workflow_pool.start()
+        startup_tracker.mark_ready()
+    except Exception as e:
+        startup_tracker.mark_failed(e)
+        if raise_errors:
+            raise
+
+@app.on_event("startup")
+async def startup():
+    """Initialize the database, then warm up the chat services
+
+    With BACKGROUND_WARMUP the server starts accepting requests right away
+    (/health answers, /ready reports 503 until warm-up has finished).
+    """
+    setup_logging()
+    with startup_tracker.phase('database'):
+        init_db()
+    if BACKGROUND_WARMUP:
+        app.state.warmup_task = asyncio.create_task(_warm_up())
+    else:
+        await _warm_up(raise_errors=True)
+
+async def _ensure_ready():
+    """Wait for warm-up to finish before serving a chat request"""
+    if not await startup_tracker.wait_ready(timeout=WORKFLOW_POOL_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Server is starting, please retry")
 
 class ChatMessage(BaseModel):
     message: str
@@ -57,6 +128,7 @@ class ChatResponse(BaseModel):
     response: str
     confidence: Optional[float] = None
     source: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = None
 
 # User Memory Models
 class UserMemoryBase(BaseModel):
@@ -88,6 +160,43 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Report whether models and workflows are loaded, with the startup time breakdown"""
+    return JSONResponse(
+        status_code=200 if startup_tracker.ready else 503,
+        content=startup_tracker.report()
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Expose runtime statistics of the shared services"""
+    # Imported here: the reranker pulls in LangChain, which the server defers to warm-up
+    from src.helpers.reranker import get_reranker
+    return {
+        "startup": startup_tracker.report(),
+        "workflow_pool": workflow_pool.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "llm_cache": get_llm_cache().stats() if LLM_CACHE_ENABLED else None,
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "exact_match": exact_match_stats(),
+        "reranker": get_reranker().stats(),
+        "models": model_registry.stats(),
+    }
+
+@app.get("/admin/knowledge-base")
+async def knowledge_base_dump(limit: int = 20, offset: int = 0):
+    """Diagnostic dump of the documents stored in the knowledge base"""
+    await _ensure_ready()
+    if limit < 1 or limit > 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500 and offset non-negative")
+    try:
+        from src.helpers.document_retriever import dump_documents
+        return await asyncio.to_thread(dump_documents, limit, offset)
+    except Exception as e:
+        logger.error(f"Error dumping knowledge base: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # User Memory Endpoints
 @app.post("/user-memories/", response_model=UserMemoryResponse, status_code=status.HTTP_201_CREATED)
 def create_user_memory(user_memory: UserMemoryCreate, db: Session = Depends(get_db)):
@@ -97,11 +206,15 @@ def create_user_memory(user_memory: UserMemoryCreate, db: Session = Depends(get_
     Note: Each user can only have one memory entry.
     """
     try:
-        return UserMemoryManager.create_memory(
+        created = UserMemoryManager.create_memory(
             user_id=user_memory.user_id,
             name=user_memory.name,
             description=user_memory.description
         )
+        # Cached answers for this patient were generated without a profile
+        if semantic_cache:
+            semantic_cache.invalidate(context_key=user_memory.user_id)
+        return created
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -136,6 +249,9 @@ def update_user_memory_by_user(
         )
         if not updated:
             raise HTTPException(status_code=404, detail=f"No memory found for user {user_id}")
+        # Cached answers were personalised with the previous profile
+        if semantic_cache:
+            semantic_cache.invalidate(context_key=user_id)
         return updated
     except Exception as e:
         logger.error(f"Error updating user memory: {str(e)}")
@@ -146,8 +262,56 @@ def delete_user_memory_by_user(user_id: int, db: Session = Depends(get_db)):
     """Delete a user memory by user ID"""
     if not UserMemoryManager.delete_memory(user_id):
         raise HTTPException(status_code=404, detail=f"No memory found for user {user_id}")
+    if semantic_cache:
+        semantic_cache.invalidate(context_key=user_id)
     return None
 
+def _sources_from_state(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Extract the knowledge base entries an answer was built from"""
+    return [
+        {"question": res['question'], "answer": res['answer']}
+        for res in state.get('search_results', []) or []
+        if 'answer' in res and 'question' in res
+    ]
+
+async def _cache_lookup(message: ChatMessage):
+    """Look the message up in the semantic cache
+    
+    Returns:
+        (cached entry or None, query embedding or None)
+    """
+    if not semantic_cache:
+        return None, None
+    try:
+        embedding = await asyncio.to_thread(semantic_cache.embed, message.message)
+        return semantic_cache.lookup(embedding, context_key=message.patient_id or 0), embedding
+    except Exception as e:
+        logger.error(f"Semantic cache lookup failed: {str(e)}")
+        return None, None
+
+def _cache_store(message: ChatMessage, embedding, state: Dict[str, Any], response: str) -> None:
+    """Cache a successful workflow answer
+    
+    Only answers generated by the agent or taken from the exact-question index
+    are stored; canned replies (no relevant results, errors) are not, so a
+    transient failure is not replayed for similar questions.
+    """
+    if not semantic_cache or embedding is None or state.get('error_state'):
+        return
+    if state.get('response_source') not in CACHEABLE_SOURCES:
+        return
+    try:
+        semantic_cache.store(
+            query=message.message,
+            embedding=embedding,
+            response=response,
+            answer=state.get('answer', response),
+            sources=_sources_from_state(state),
+            context_key=message.patient_id or 0
+        )
+    except Exception as e:
+        logger.error(f"Semantic cache store failed: {str(e)}")
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(message: ChatMessage):
     """Process chat messages and return responses
@@ -159,12 +323,22 @@ async def chat(message: ChatMessage):
         ChatResponse with the AI's response
     """
     try:
-        work_flow = WorkFlow()
-        # Pass both message and patient_id to the workflow
-        response = work_flow(
-            message=message.message,
-            patient_id=message.patient_id if hasattr(message, 'patient_id') else 0
-        )
+        await _ensure_ready()
+        cached, embedding = await _cache_lookup(message)
+        if cached:
+            logger.info(f"Semantic cache hit (similarity {cached['similarity']:.3f}) for: {message.message}")
+            return ChatResponse(
+                response=cached['response'],
+                confidence=cached['similarity'],
+                source="semantic_cache"
+            )
+        
+        async with workflow_pool.acquire(timeout=WORKFLOW_POOL_TIMEOUT) as work_flow:
+            # Pass both message and patient_id to the workflow
+            response = await work_flow.ainvoke(
+                message=message.message,
+                patient_id=message.patient_id if hasattr(message, 'patient_id') else 0
+            )
         
         # Get the last message from the workflow response
         messages = response.get('messages', [])
@@ -173,16 +347,79 @@ async def chat(message: ChatMessage):
             
         ai_response = messages[-1].content if hasattr(messages[-1], 'content') else str(messages[-1])
         logger.info(f"AI response for patient {getattr(message, 'patient_id', 0)}: {ai_response}")
+        _cache_store(message, embedding, response, ai_response)
         
         # Return the response in the expected format
         return ChatResponse(
             response=ai_response,
             confidence=1.0,  # Default confidence
-            source="cancer_agent"  # Default source
+            source=response.get('response_source') or "cancer_agent",
+            stats={"relevance": response['relevance_stats']} if response.get('relevance_stats') else None
         )
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        logger.error("Timed out waiting for a free workflow instance")
+        raise HTTPException(status_code=503, detail="Server is busy, please retry")
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Stream the chat response as Server-Sent Events
+    
+    Emits `token` events with pieces of the answer as the agent generates them,
+    a `sources` event with the knowledge base entries used, then `done`.
+    Failures are reported as an `error` event.
+    
+    Args:
+        message: ChatMessage containing the message and optional patient_id
+    """
+    await _ensure_ready()
+    
+    async def event_stream():
+        try:
+            cached, embedding = await _cache_lookup(message)
+            if cached:
+                logger.info(f"Semantic cache hit (similarity {cached['similarity']:.3f}) for: {message.message}")
+                yield _sse_event("token", {"text": cached['answer']})
+                yield _sse_event("sources", {"sources": cached['sources']})
+                yield _sse_event("done", {"source": "semantic_cache"})
+                return
+            
+            async with workflow_pool.acquire(timeout=WORKFLOW_POOL_TIMEOUT) as work_flow:
+                source = "cancer_agent"
+                stats = None
+                async for event, data in work_flow.astream(
+                    message=message.message,
+                    patient_id=message.patient_id if hasattr(message, 'patient_id') else 0
+                ):
+                    if event == "token":
+                        yield _sse_event("token", {"text": data})
+                    elif event == "final":
+                        yield _sse_event("sources", {"sources": _sources_from_state(data)})
+                        source = data.get('response_source') or source
+                        if data.get('relevance_stats'):
+                            stats = {"relevance": data['relevance_stats']}
+                        messages = data.get('messages', [])
+                        if messages:
+                            _cache_store(message, embedding, data, messages[-1].content)
+            yield _sse_event("done", {"source": source, "stats": stats})
+        except asyncio.TimeoutError:
+            logger.error("Timed out waiting for a free workflow instance")
+            yield _sse_event("error", {"detail": "Server is busy, please retry"})
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {str(e)}")
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
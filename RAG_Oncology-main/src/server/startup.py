@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.config.logs import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+class StartupTracker:
+    """Tracks the startup phases of the API server and whether it is ready to serve chats."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._ready = False
+        self._event: Optional[asyncio.Event] = None
+        self._started_at = time.perf_counter()
+        self._finished_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 3)
+            logger.info(f"Startup phase '{name}' took {self.phases[name]:.3f}s")
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a phase that was timed elsewhere"""
+        self.phases[name] = round(seconds, 3)
+
+    def _get_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self._ready or self.error:
+                self._event.set()
+        return self._event
+
+    def mark_ready(self) -> None:
+        self._ready = True
+        self._finished_at = time.perf_counter()
+        self._get_event().set()
+        breakdown = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        logger.info(f"Server ready in {self._finished_at - self._started_at:.3f}s ({breakdown})")
+
+    def mark_failed(self, error: Exception) -> None:
+        self.error = str(error)
+        self._finished_at = time.perf_counter()
+        self._get_event().set()
+        logger.error(f"Server startup failed: {self.error}")
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until startup has finished.
+
+        Returns:
+            bool: True if the server is ready, False if startup failed or timed out
+        """
+        if self._ready:
+            return True
+        try:
+            await asyncio.wait_for(self._get_event().wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self._ready
+
+    def report(self) -> Dict[str, Any]:
+        """Return readiness and the per-phase startup breakdown"""
+        if self._ready:
+            status = "ready"
+        elif self.error:
+            status = "failed"
+        else:
+            status = "starting"
+        end = self._finished_at if self._finished_at is not None else time.perf_counter()
+        return {
+            "status": status,
+            "error": self.error,
+            "elapsed_seconds": round(end - self._started_at, 3),
+            "phases": dict(self.phases),
+        }
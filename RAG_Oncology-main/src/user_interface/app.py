@@ -1,3 +1,5 @@
+import json
+
 import gradio as gr
 import requests
 
@@ -18,6 +20,50 @@ def chat_with_agent(message, history, user_id) -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
+def format_sources(sources) -> str:
+    """Format the sources block appended below an answer"""
+    if not sources:
+        return ""
+    formatted = [
+        f"Source {i}:\nQ: {source['question']}\nA: {source['answer']}"
+        for i, source in enumerate(sources, 1)
+    ]
+    return "\n---\n**Sources:**\n" + "\n".join(formatted)
+
+def stream_chat_with_agent(message, user_id):
+    """Stream the response from the chat endpoint, yielding the text received so far"""
+    text = ""
+    try:
+        with requests.post(
+            f"{API_URL}/chat/stream",
+            json={"message": message, "patient_id": user_id},
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):].strip())
+                if event == "token":
+                    text += data.get("text", "")
+                    yield text
+                elif event == "sources":
+                    text += format_sources(data.get("sources", []))
+                    yield text
+                elif event == "error":
+                    yield f"Error: {data.get('detail', 'Unknown error')}"
+                    return
+        if not text:
+            yield "No response from server"
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
 def create_memory(user_id, name, description):
     """Create a new user memory"""
     try:
@@ -66,18 +112,17 @@ def create_chat_interface():
             
             def respond(message, chat_history, user_id):
                 if not message.strip():
-                    return "", chat_history
+                    yield "", chat_history
+                    return
                 
                 # Add user message to chat history
                 chat_history.append({"role": "user", "content": message})
                 
-                # Get bot response
-                bot_message = chat_with_agent(message, chat_history, user_id)
-                
-                # Add bot response to chat history
-                chat_history.append({"role": "assistant", "content": bot_message})
-                
-                return "", chat_history
+                # Render the bot response as it streams in
+                chat_history.append({"role": "assistant", "content": ""})
+                for partial in stream_chat_with_agent(message, user_id):
+                    chat_history[-1]["content"] = partial
+                    yield "", chat_history
             
             send_btn.click(
                 respond,
@@ -150,9 +195,11 @@ def create_chat_interface():
             
             def check_status():
                 try:
-                    response = requests.get(f"{API_URL}/health")
+                    response = requests.get(f"{API_URL}/ready")
                     if response.status_code == 200:
                         return "✅ API is running and healthy!"
+                    if response.status_code == 503 and response.json().get("status") == "starting":
+                        return "⏳ API is up and still loading its models..."
                     return f"⚠️ API returned status code: {response.status_code}"
                 except Exception as e:
                     return f"❌ Could not connect to API: {str(e)}"
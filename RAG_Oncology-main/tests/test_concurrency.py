@@ -0,0 +1,63 @@
+"""Bounded fan-out helpers: ordering, failures and per-call timeouts."""
+import asyncio
+import contextvars
+import time
+
+from src.helpers.concurrency import gather_bounded, map_bounded
+
+
+def _sleep_and_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+async def _asleep_and_return(seconds):
+    await asyncio.sleep(seconds)
+    return seconds
+
+
+def test_map_bounded_times_out_each_call_from_its_own_start():
+    results = map_bounded(_sleep_and_return, [0.1, 0.5, 0.1, 0.1], limit=2, timeout=0.3, default="timeout")
+    assert results == [0.1, "timeout", 0.1, 0.1]
+
+
+def test_map_bounded_and_gather_bounded_agree_on_timeouts():
+    items = [0.1, 0.5, 0.1, 0.1]
+    threaded = map_bounded(_sleep_and_return, items, limit=2, timeout=0.3, default="timeout")
+    awaited = asyncio.run(gather_bounded(_asleep_and_return, items, limit=2, timeout=0.3, default="timeout"))
+    assert threaded == awaited
+
+
+def test_map_bounded_does_not_charge_queueing_time_to_a_call():
+    results = map_bounded(_sleep_and_return, [0.2] * 4, limit=1, timeout=0.3, default="timeout")
+    assert results == [0.2] * 4
+
+
+def test_map_bounded_limits_concurrency():
+    running = []
+    peak = []
+
+    def track(item):
+        running.append(item)
+        peak.append(len(running))
+        time.sleep(0.05)
+        running.remove(item)
+        return item
+
+    assert map_bounded(track, list(range(6)), limit=2) == list(range(6))
+    assert max(peak) <= 2
+
+
+def test_map_bounded_uses_default_for_failures():
+    def fail_on_two(item):
+        if item == 2:
+            raise ValueError("boom")
+        return item * 10
+
+    assert map_bounded(fail_on_two, [1, 2, 3], limit=3, default=-1) == [10, -1, 30]
+
+
+def test_map_bounded_runs_calls_in_the_caller_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+    request_id.set("abc")
+    assert map_bounded(lambda _: request_id.get(), [1, 2], limit=2) == ["abc", "abc"]
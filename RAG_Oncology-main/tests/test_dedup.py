@@ -0,0 +1,87 @@
+"""Near-duplicate removal within and across ingestion chunks."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.helpers.dedup import KeptQuestions, near_duplicates
+
+
+def _unit(*components: float, dim: int = 8) -> np.ndarray:
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector / np.linalg.norm(vector)
+
+
+# Two paraphrases of one question and an unrelated one
+CHEMO = _unit(1.0, 0.0)
+CHEMO_PARAPHRASE = _unit(1.0, 0.1)
+DIET = _unit(0.0, 1.0)
+
+
+def test_near_duplicates_keeps_longer_answer_within_a_chunk():
+    embeddings = np.stack([CHEMO, CHEMO_PARAPHRASE, DIET])
+    dropped = near_duplicates(embeddings, np.array([10, 50, 20]))
+    assert dropped.tolist() == [True, False, False]
+
+
+def test_later_chunk_with_shorter_answer_is_dropped():
+    kept = KeptQuestions()
+    assert not kept.add_chunk(np.stack([CHEMO, DIET]), np.array([50, 20]), ['chemo', 'diet']).any()
+
+    dropped = kept.add_chunk(np.stack([CHEMO_PARAPHRASE]), np.array([10]), ['chemo-2'])
+
+    assert dropped.tolist() == [True]
+    assert kept.kept_ids() == {'chemo', 'diet'}
+
+
+def test_later_chunk_with_longer_answer_replaces_the_kept_row():
+    kept = KeptQuestions()
+    kept.add_chunk(np.stack([CHEMO, DIET]), np.array([10, 20]), ['chemo', 'diet'])
+
+    dropped = kept.add_chunk(np.stack([CHEMO_PARAPHRASE]), np.array([50]), ['chemo-2'])
+
+    assert dropped.tolist() == [False]
+    assert kept.kept_ids() == {'chemo-2', 'diet'}
+    assert len(kept) == 2
+
+
+def test_equal_answers_keep_the_earlier_row():
+    kept = KeptQuestions()
+    kept.add_chunk(np.stack([CHEMO]), np.array([30]), ['chemo'])
+
+    assert kept.add_chunk(np.stack([CHEMO]), np.array([30]), ['chemo']).tolist() == [True]
+    assert kept.kept_ids() == {'chemo'}
+
+
+def test_exact_duplicate_questions_across_chunks_keep_the_longer_answer():
+    init_vectorstore = pytest.importorskip("src.helpers.init_vectorstore")
+
+    vectors = {
+        "What is chemotherapy?": CHEMO,
+        "What is chemotherapy ?": CHEMO_PARAPHRASE,
+        "What should I eat during treatment?": DIET,
+    }
+
+    class FakeEmbedder:
+        def embed(self, texts):
+            return np.stack([vectors[text] for text in texts])
+
+    chunks = [
+        pd.DataFrame({
+            'Question': ["What is chemotherapy?", "What should I eat during treatment?"],
+            'Answer': ["Short.", "A balanced diet."],
+        }),
+        pd.DataFrame({
+            'Question': ["What is chemotherapy?", "What is chemotherapy ?"],
+            'Answer': ["A much longer and more complete answer.", "Tiny."],
+        }),
+    ]
+    kept = KeptQuestions()
+    survivors = [init_vectorstore._remove_duplicates(chunk, embedder=FakeEmbedder(), kept=kept) for chunk in chunks]
+
+    assert survivors[0]['Answer'].tolist() == ["Short.", "A balanced diet."]
+    assert survivors[1]['Answer'].tolist() == ["A much longer and more complete answer."]
+    assert kept.kept_ids() == {
+        init_vectorstore.document_id("What is chemotherapy?"),
+        init_vectorstore.document_id("What should I eat during treatment?"),
+    }
@@ -0,0 +1,22 @@
+"""Failure reporting of the knowledge-base search."""
+import pytest
+
+pytest.importorskip("langchain_chroma")
+from src.helpers import document_retriever  # noqa: E402
+
+
+@pytest.fixture
+def failing_search(monkeypatch):
+    def search(query, k):
+        raise ConnectionError("vector store unreachable")
+
+    monkeypatch.setattr(document_retriever, "_similarity_search_with_score", search)
+
+
+def test_search_failure_returns_no_results_by_default(failing_search):
+    assert document_retriever.search_qa("What is chemotherapy?") == []
+
+
+def test_search_failure_is_raised_on_request(failing_search):
+    with pytest.raises(ConnectionError):
+        document_retriever.search_qa("What is chemotherapy?", raise_errors=True)
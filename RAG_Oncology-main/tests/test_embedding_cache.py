@@ -0,0 +1,43 @@
+"""Recovery of the on-disk embedding cache after an interrupted write."""
+import numpy as np
+
+from src.helpers.embedding_cache import DiskEmbeddingCache
+
+
+def compute(texts):
+    return np.array([[len(text), 1, 2, 3] for text in texts], dtype=np.float32)
+
+
+def must_not_compute(texts):
+    raise AssertionError(f"cached texts recomputed: {texts}")
+
+
+def test_partial_trailing_row_is_dropped(tmp_path):
+    cache = DiskEmbeddingCache(tmp_path, "model")
+    cache.embed(["a", "bb"], compute)
+    with open(cache.vectors_path, 'ab') as file:
+        file.write(b"\x01\x02\x03")
+
+    reopened = DiskEmbeddingCache(tmp_path, "model")
+    assert reopened.vectors_path.stat().st_size == 2 * 4 * 2
+    np.testing.assert_array_equal(reopened.embed(["dddd"], compute), [[4, 1, 2, 3]])
+
+    again = DiskEmbeddingCache(tmp_path, "model")
+    np.testing.assert_array_equal(
+        again.embed(["a", "bb", "dddd"], must_not_compute),
+        [[1, 1, 2, 3], [2, 1, 2, 3], [4, 1, 2, 3]],
+    )
+
+
+def test_index_rows_past_the_vectors_are_not_reused(tmp_path):
+    cache = DiskEmbeddingCache(tmp_path, "model")
+    cache.embed(["a", "bb"], compute)
+    with open(cache.vectors_path, 'r+b') as file:
+        file.truncate(4 * 2)
+
+    reopened = DiskEmbeddingCache(tmp_path, "model")
+    np.testing.assert_array_equal(reopened.embed(["ccc"], compute), [[3, 1, 2, 3]])
+
+    # "bb" pointed at row 1, which now holds "ccc"
+    again = DiskEmbeddingCache(tmp_path, "model")
+    np.testing.assert_array_equal(again.embed(["bb", "ccc"], compute), [[2, 1, 2, 3], [3, 1, 2, 3]])
@@ -0,0 +1,63 @@
+"""Parsing of structured LLM answers and reuse of retrieval on the one-shot fallback."""
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+from src.helpers.relevance_checker import _parse_batch_judgements, as_bool  # noqa: E402
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), ("true", True), ("True ", True), ("yes", True),
+    ("false", False), ("no", False), ("", False), (1, True), (0, False),
+])
+def test_as_bool_reads_quoted_booleans(value, expected):
+    assert as_bool(value) is expected
+
+
+def test_batch_judgements_read_quoted_booleans():
+    content = '{"judgements": [{"id": 1, "relevant": "false"}, {"id": 2, "relevant": "true"}]}'
+    assert _parse_batch_judgements(content, 2) == [False, True]
+
+
+@pytest.fixture
+def relevance_check():
+    pytest.importorskip("langchain_chroma")
+    from src.relevance_check import relevance_check_edit
+    return relevance_check_edit
+
+
+def _checker(module):
+    checker = module.HybridRelevanceChecker.__new__(module.HybridRelevanceChecker)
+    checker.confidence_threshold = 0.85
+    checker.max_concurrency = 2
+    checker.call_timeout = 5.0
+    return checker
+
+
+def test_one_shot_parser_reads_quoted_booleans(relevance_check):
+    content = (
+        '{"oncology": "false", "candidates": ['
+        '{"id": 1, "match": "false", "confidence": 0.9}, {"id": 2, "match": "true", "confidence": 0.8}]}'
+    )
+    parsed = _checker(relevance_check)._parse_one_shot(content, 2)
+    assert parsed['oncology'] is False
+    assert [verification['match'] for verification in parsed['verifications']] == [False, True]
+
+
+def test_check_match_reuses_candidates_of_the_one_shot_attempt(relevance_check, monkeypatch):
+    def no_search(**kwargs):
+        raise AssertionError("search_qa must not run again")
+
+    monkeypatch.setattr(relevance_check, "search_qa", no_search)
+    checker = _checker(relevance_check)
+    checker.verify_match = lambda query, candidate, similarity: {
+        'similarity': similarity,
+        'verification': {'match': True, 'confidence': 1.0, 'reason': ''},
+        'combined_score': min(1.0, (similarity + 1.0) / 2),
+    }
+    candidates = ([{'question': 'What is chemotherapy?', 'answer': 'A drug treatment.'}], np.array([0.95]))
+
+    result = checker.check_match("What is chemotherapy?", on_topic=True, candidates=candidates)
+
+    assert result['status'] == 'direct_match'
+    assert result['match_data']['answer'] == 'A drug treatment.'
@@ -0,0 +1,70 @@
+"""Platt calibration of cross-encoder scores and the relevance strategy setting."""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.helpers import relevance_calibration
+from src.helpers.relevance_calibration import RelevanceCalibration, calibrate, fit_platt, knowledge_base_pairs
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_fit_platt_recovers_the_generating_curve():
+    rng = np.random.default_rng(0)
+    logits = rng.uniform(-10, 10, 20000)
+    labels = rng.random(20000) < 1 / (1 + np.exp(-(0.5 * logits - 1.0)))
+
+    a, b = fit_platt(logits, labels)
+
+    assert a == pytest.approx(0.5, abs=0.05)
+    assert b == pytest.approx(-1.0, abs=0.1)
+
+
+def test_fit_platt_stays_finite_on_separable_data():
+    a, b = fit_platt(np.array([-3.0, -2.0, 2.0, 3.0]), np.array([0, 0, 1, 1]))
+    assert np.isfinite([a, b]).all()
+    assert RelevanceCalibration(a, b).probabilities([3.0])[0] > 0.5
+
+
+def test_fit_platt_needs_both_classes():
+    with pytest.raises(ValueError):
+        fit_platt(np.array([1.0, 2.0]), np.array([1, 1]))
+
+
+class FakeCrossEncoder:
+    """Scores a pair by whether the document is the query's own entry."""
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        return np.array([4.0 if f"Question: {query}\n" in text else -2.0 for query, text in pairs])
+
+
+def test_knowledge_base_calibration_is_saved_and_reloaded(tmp_path):
+    entries = [{'question': f"Question number {i}?", 'answer': f"Answer {i}."} for i in range(20)]
+    embed = lambda texts: np.random.default_rng(len(texts)).standard_normal((len(texts), 8))
+    pairs = knowledge_base_pairs(entries, embed, sample_size=10)
+    assert len(pairs) == 30
+    assert sum(relevant for _, _, relevant in pairs) == 10
+
+    path = tmp_path / 'calibration.json'
+    calibrate(pairs, FakeCrossEncoder(), path, source="knowledge_base")
+    calibration = relevance_calibration.get_relevance_calibration(path)
+
+    assert calibration.info['source'] == "knowledge_base"
+    assert calibration.probabilities([4.0])[0] > 0.5 > calibration.probabilities([-2.0])[0]
+
+
+def test_missing_calibration_returns_none(tmp_path):
+    assert relevance_calibration.get_relevance_calibration(tmp_path / 'missing.json') is None
+
+
+def test_unknown_relevance_strategy_is_rejected_at_settings_load():
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.config.settings"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={"PATH": "", "RELEVANCE_STRATEGY": "cross-encoder"},
+    )
+    assert result.returncode != 0
+    assert "RELEVANCE_STRATEGY must be one of llm, cross_encoder, hybrid" in result.stderr
@@ -0,0 +1,111 @@
+"""LLM call accounting of the relevance gate."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+from src.helpers import relevance_checker  # noqa: E402
+from src.llm_factory.gemini import _record_call, count_llm_calls  # noqa: E402
+
+
+class FakeLLM:
+    """Answers every prompt with a fixed text and counts itself like GoogleGen."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def __call__(self, messages, prompt_type='default'):
+        _record_call(prompt_type)
+        return SimpleNamespace(content=self.content)
+
+    async def ainvoke(self, messages, prompt_type='default'):
+        return self(messages, prompt_type)
+
+
+RESULTS = [
+    {'question': 'What is chemotherapy?', 'answer': '...', 'score': 0.95},
+    {'question': 'How long does radiotherapy last?', 'answer': '...', 'score': 0.5},
+    {'question': 'Is fatigue common?', 'answer': '...', 'score': 0.6},
+    {'question': 'How do I bake bread?', 'answer': '...', 'score': 0.1},
+]
+
+
+def test_gate_reports_calls_made_when_the_batch_answer_is_unusable():
+    # Not JSON: the batch check falls back to one call per uncertain result
+    verdicts, stats = relevance_checker.check_relevance_gated("chemo", RESULTS, FakeLLM("yes"), batch=True)
+
+    assert verdicts == [True, True, True, False]
+    assert stats['sent_to_llm'] == 2
+    assert stats['llm_calls'] == 3
+
+
+def test_gate_reports_one_call_for_a_parsed_batch():
+    answer = '{"judgements": [{"id": 1, "relevant": true}, {"id": 2, "relevant": "false"}]}'
+    verdicts, stats = relevance_checker.check_relevance_gated("chemo", RESULTS, FakeLLM(answer), batch=True)
+
+    assert verdicts == [True, True, False, False]
+    assert stats['llm_calls'] == 1
+
+
+def test_async_gate_counts_per_item_calls():
+    verdicts, stats = asyncio.run(
+        relevance_checker.acheck_relevance_gated("chemo", RESULTS, FakeLLM("no"), batch=False)
+    )
+
+    assert verdicts == [True, False, False, False]
+    assert stats['llm_calls'] == 2
+    assert stats['llm_calls_avoided'] == 2
+
+
+def test_nested_counters_report_to_the_enclosing_block():
+    with count_llm_calls() as outer:
+        relevance_checker.check_relevance_gated("chemo", RESULTS, FakeLLM("yes"), batch=False)
+    assert outer.total == 2
+
+
+class FailingLLM:
+    def __call__(self, messages, prompt_type='default'):
+        raise RuntimeError("quota exceeded")
+
+
+class AsyncFailingLLM(FailingLLM):
+    async def ainvoke(self, messages, prompt_type='default'):
+        raise RuntimeError("quota exceeded")
+
+
+def test_batch_check_logs_failures_instead_of_printing(caplog, capsys):
+    with caplog.at_level("WARNING", logger="src.helpers.relevance_checker"):
+        assert relevance_checker.check_relevance_batch("chemo", RESULTS[:2], FakeLLM("yes")) == [True, True]
+        assert relevance_checker.check_relevance_batch("chemo", RESULTS[:2], FailingLLM()) == [False, False]
+
+    levels = [(record.levelname, record.getMessage()) for record in caplog.records]
+    assert ("WARNING", "Could not parse batched relevance judgements, checking results one by one") in levels
+    assert ("ERROR", "Error checking relevance: quota exceeded") in levels
+    assert capsys.readouterr().out == ""
+
+
+def test_failed_batch_call_falls_back_to_per_result_checks():
+    class BatchFailsLLM(FakeLLM):
+        def __call__(self, messages, prompt_type='default'):
+            if prompt_type == 'relevance_batch':
+                raise RuntimeError("quota exceeded")
+            return super().__call__(messages, prompt_type)
+
+    verdicts, stats = relevance_checker.check_relevance_gated("chemo", RESULTS, BatchFailsLLM("yes"), batch=True)
+
+    assert verdicts == [True, True, True, False]
+    assert stats['llm_calls'] == 2
+    assert stats['llm_errors'] == 0
+
+
+def test_failed_checks_are_reported_as_errors():
+    verdicts, stats = relevance_checker.check_relevance_gated("chemo", RESULTS, FailingLLM(), batch=True)
+    assert verdicts == [True, False, False, False]
+    assert stats['llm_errors'] == 2
+
+    verdicts, stats = asyncio.run(
+        relevance_checker.acheck_relevance_gated("chemo", RESULTS, AsyncFailingLLM(), batch=False)
+    )
+    assert verdicts == [True, False, False, False]
+    assert stats['llm_errors'] == 2
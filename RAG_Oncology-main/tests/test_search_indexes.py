@@ -0,0 +1,131 @@
+"""Building and loading the NumPy and IVF retriever indexes."""
+import numpy as np
+import pytest
+
+from src.helpers import ivf_index, kb_version, numpy_store
+from src.helpers.numpy_store import IndexUnavailableError, NumpyVectorIndex
+
+
+class FakeCollection:
+    """The part of the Chroma collection API used by the index exports."""
+
+    def __init__(self, count: int = 40, dim: int = 8, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+        self.ids = [f"doc-{i}" for i in range(count)]
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, limit, offset, include):
+        ids = self.ids[offset:offset + limit]
+        return {
+            'ids': ids,
+            'embeddings': self.embeddings[offset:offset + limit],
+            'documents': [f"Question: q{doc_id}\nAnswer: a{doc_id}" for doc_id in ids],
+            'metadatas': [{} for _ in ids],
+        }
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    index_dir = tmp_path / 'numpy_index'
+    monkeypatch.setattr(kb_version, 'KB_VERSION_FILE', tmp_path / 'kb_version')
+    monkeypatch.setattr(numpy_store, 'NUMPY_INDEX_DIR', index_dir)
+    monkeypatch.setattr(ivf_index, 'NUMPY_INDEX_DIR', index_dir)
+    kb_version.bump_kb_version()
+    return index_dir
+
+
+def test_missing_numpy_index_fails_loudly(index_dir):
+    with pytest.raises(IndexUnavailableError, match="No NumPy index"):
+        numpy_store._load_numpy_index()
+
+
+def test_numpy_index_of_another_kb_version_is_rejected(index_dir):
+    NumpyVectorIndex.build_from_collection(FakeCollection(), index_dir, kb_version=kb_version.read_kb_version())
+    assert len(numpy_store._load_numpy_index()) == 40
+
+    kb_version.bump_kb_version()
+
+    with pytest.raises(IndexUnavailableError, match="another knowledge-base version"):
+        numpy_store._load_numpy_index()
+
+
+def test_missing_ivf_index_fails_loudly_next_to_a_current_numpy_index(index_dir):
+    NumpyVectorIndex.build_from_collection(FakeCollection(), index_dir, kb_version=kb_version.read_kb_version())
+
+    with pytest.raises(IndexUnavailableError, match="No IVF index"):
+        ivf_index._load_ivf_index()
+
+
+def test_index_is_current_checks_version_and_metadata(index_dir):
+    version = kb_version.read_kb_version()
+    assert not numpy_store.index_is_current(index_dir)
+
+    NumpyVectorIndex.build_from_collection(FakeCollection(), index_dir, dtype='float16', kb_version=version)
+
+    assert numpy_store.index_is_current(index_dir, dtype='float16')
+    assert not numpy_store.index_is_current(index_dir, dtype='float32')
+    assert not numpy_store.index_is_current(index_dir, kb_version='other')
+
+
+def test_ingestion_builds_missing_ivf_index_without_kb_changes(index_dir, monkeypatch):
+    init_vectorstore = pytest.importorskip("src.helpers.init_vectorstore")
+    monkeypatch.setattr(init_vectorstore, 'NUMPY_INDEX_DIR', index_dir)
+    collection = FakeCollection()
+
+    init_vectorstore.build_search_indexes(collection, backend='chroma')
+    assert not index_dir.exists()
+
+    init_vectorstore.build_search_indexes(collection, backend='ivf')
+    assert len(ivf_index._load_ivf_index().ids) == 40
+
+
+def test_indexes_stamped_before_publishing_are_current_on_reload(index_dir):
+    NumpyVectorIndex.build_from_collection(FakeCollection(), index_dir, kb_version=kb_version.read_kb_version())
+    resource = kb_version.VersionedResource(numpy_store._load_numpy_index, name="NumPy index", check_interval=0)
+    assert len(resource.get()) == 40
+
+    version = kb_version.new_kb_version()
+    NumpyVectorIndex.build_from_collection(FakeCollection(count=50), index_dir, kb_version=version)
+    kb_version.bump_kb_version(version)
+
+    assert len(resource.get()) == 50
+
+
+def test_failed_reload_keeps_serving_the_previous_index(index_dir):
+    NumpyVectorIndex.build_from_collection(FakeCollection(), index_dir, kb_version=kb_version.read_kb_version())
+    resource = kb_version.VersionedResource(numpy_store._load_numpy_index, name="NumPy index", check_interval=0)
+    previous = resource.get()
+
+    # The version is published before the index of that version exists
+    kb_version.bump_kb_version()
+    assert resource.get() is previous
+
+    NumpyVectorIndex.build_from_collection(FakeCollection(count=50), index_dir, kb_version=kb_version.read_kb_version())
+    assert len(resource.get()) == 50
+
+
+def test_documents_are_read_on_demand_for_the_hits(index_dir):
+    collection = FakeCollection()
+    collection.ids[3] = "doc-3-é"
+    NumpyVectorIndex.build_from_collection(collection, index_dir, kb_version=kb_version.read_kb_version())
+    index = numpy_store._load_numpy_index()
+
+    assert isinstance(index.documents, numpy_store.DocumentStore)
+    doc, score = index.search_by_vector(collection.embeddings[3], k=1)[0]
+    assert doc.id == "doc-3-é"
+    assert doc.page_content == "Question: qdoc-3-é\nAnswer: adoc-3-é"
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_documents_of_an_index_without_offsets_file_are_found_by_scanning(index_dir):
+    collection = FakeCollection()
+    NumpyVectorIndex.build_from_collection(collection, index_dir, kb_version=kb_version.read_kb_version())
+    (index_dir / numpy_store.DOCUMENT_OFFSETS_FILE).unlink()
+
+    documents = numpy_store.DocumentStore(index_dir)
+
+    assert len(documents) == 40
+    assert [documents[i].id for i in (0, 17, 39)] == ["doc-0", "doc-17", "doc-39"]
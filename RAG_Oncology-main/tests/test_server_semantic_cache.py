@@ -0,0 +1,103 @@
+"""Semantic cache invalidation and which chat answers get cached."""
+import hashlib
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+import src.server.app as server
+from src.helpers.semantic_cache import SemanticCache
+
+
+def _fake_embedding(text: str) -> np.ndarray:
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(16).astype(np.float32)
+
+
+class _FakeWorkflow:
+    def __init__(self):
+        self.calls = 0
+        self.extra_state = {"response_source": "cancer_agent"}
+
+    async def ainvoke(self, message, patient_id=0):
+        self.calls += 1
+        return {"messages": [AIMessage(content=f"answer {self.calls} for patient {patient_id}")], **self.extra_state}
+
+
+class _FakePool:
+    def __init__(self, workflow):
+        self.workflow = workflow
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield self.workflow
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def ready():
+        return None
+
+    workflow = _FakeWorkflow()
+    monkeypatch.setattr(server, "semantic_cache", SemanticCache(embed_fn=_fake_embedding))
+    monkeypatch.setattr(server, "workflow_pool", _FakePool(workflow))
+    monkeypatch.setattr(server, "_ensure_ready", ready)
+    monkeypatch.setattr(
+        server.UserMemoryManager, "create_memory",
+        staticmethod(lambda user_id, name=None, description=None: {
+            "id": 1, "user_id": user_id, "name": name, "description": description
+        })
+    )
+    client = TestClient(server.app)
+    client.workflow = workflow
+    return client
+
+
+def test_create_user_memory_invalidates_cached_answers(client):
+    message = {"message": "What are the side effects of chemotherapy?", "patient_id": 7}
+
+    first = client.post("/chat", json=message).json()
+    assert first["source"] == "cancer_agent"
+    assert client.post("/chat", json=message).json()["source"] == "semantic_cache"
+
+    created = client.post("/user-memories/", json={"user_id": 7, "name": "Alice", "description": "Breast cancer"})
+    assert created.status_code == 201
+
+    after = client.post("/chat", json=message).json()
+    assert after["source"] == "cancer_agent"
+    assert after["response"] != first["response"]
+
+
+def test_create_user_memory_keeps_other_patients_cached(client):
+    message = {"message": "What is radiotherapy?", "patient_id": 3}
+    client.post("/chat", json=message)
+
+    client.post("/user-memories/", json={"user_id": 4, "name": "Bob"})
+
+    assert client.post("/chat", json=message).json()["source"] == "semantic_cache"
+
+
+@pytest.mark.parametrize("extra_state", [
+    # No relevant results: the canned reply has no response source
+    {},
+    # A relevance check failed, though the agent still answered
+    {"response_source": "cancer_agent", "error_state": True},
+])
+def test_canned_and_failed_answers_are_not_cached(client, extra_state):
+    client.workflow.extra_state = extra_state
+    message = {"message": "How long does chemotherapy take?", "patient_id": 5}
+
+    client.post("/chat", json=message)
+
+    assert client.post("/chat", json=message).json()["source"] == "cancer_agent"
+    assert client.workflow.calls == 2
+
+
+def test_exact_match_answers_are_cached(client):
+    client.workflow.extra_state = {"response_source": "exact_match"}
+    message = {"message": "What is chemotherapy?", "patient_id": 5}
+
+    assert client.post("/chat", json=message).json()["source"] == "exact_match"
+    assert client.post("/chat", json=message).json()["source"] == "semantic_cache"
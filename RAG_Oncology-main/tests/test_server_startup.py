@@ -0,0 +1,35 @@
+"""Importing the server must stay light: heavy libraries load during warm-up."""
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _modules_after_import(module: str, candidates):
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(name for name in {list(candidates)!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def test_server_import_does_not_load_langchain():
+    assert _modules_after_import("src.server.app", ["langchain", "langchain_core", "langgraph"]) == []
+
+
+def test_server_import_leaves_logging_alone(tmp_path):
+    code = (
+        "import logging, sys; sys.path.insert(0, sys.argv[1]); "
+        "marker = logging.NullHandler(); logging.getLogger().addHandler(marker); "
+        "import src.server.app; "
+        "print(marker in logging.getLogger().handlers)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(PROJECT_ROOT)], cwd=tmp_path, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "True"
+    assert not (tmp_path / "logs").exists()
@@ -0,0 +1,30 @@
+"""Validation of enumerated settings at load."""
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_settings(**env):
+    return subprocess.run(
+        [sys.executable, "-c", "import src.config.settings"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={"PATH": "", **env},
+    )
+
+
+def test_known_retriever_backend_is_accepted():
+    assert _load_settings(RETRIEVER_BACKEND=" IVF ").returncode == 0
+
+
+def test_unknown_retriever_backend_is_rejected():
+    result = _load_settings(RETRIEVER_BACKEND="numpi")
+    assert result.returncode != 0
+    assert "RETRIEVER_BACKEND must be one of chroma, numpy, ivf, got 'numpi'" in result.stderr
+
+
+def test_unknown_exact_match_mode_is_rejected():
+    result = _load_settings(EXACT_MATCH_MODE="personalise")
+    assert result.returncode != 0
+    assert "EXACT_MATCH_MODE must be one of direct, personalize, off, got 'personalise'" in result.stderr